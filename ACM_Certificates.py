@@ -12,206 +12,241 @@ Features:
 
 Requirements:
 - AWS CLI configured with profiles
-- Python packages: pandas, subprocess, json
+- Python packages: pandas, boto3, xlsxwriter
 - Proper IAM permissions for ACM describe operations
 
 How to run:
 1. Ensure virtual environment is activated: .venv\Scripts\activate
-2. Install dependencies: pip install pandas
+2. Install dependencies: pip install pandas boto3 xlsxwriter
 3. Configure AWS profiles in aws_profiles.json
 4. Run script: python ACM_Certificates.py
+   Optional: --detailed to call describe_certificate per certificate (adds SignatureAlgorithm
+             and the full SAN list when the summary is truncated)
+   Optional: --cache-dir .aws_cache to reuse responses from recent runs (--force to refresh)
 
 Output:
 - Excel file with certificate inventory and expiration analysis
 """
 
-import subprocess
-import json
+import argparse
+import numpy as np
 import pandas as pd
-from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from operator import itemgetter
+from datetime import datetime
+from aws_cache import ResponseCache, add_cache_arguments
+from aws_session import get_client, map_profiles
+from profiles import load_profiles
+from report_utils import write_xlsx
 
+MAX_WORKERS = 32
+
+# list_certificates only returns RSA_2048 certificates unless other key types are requested
+KEY_TYPES = ['RSA_1024', 'RSA_2048', 'RSA_3072', 'RSA_4096',
+             'EC_prime256v1', 'EC_secp384r1', 'EC_secp521r1']
+CERTIFICATE_STATUSES = ['PENDING_VALIDATION', 'ISSUED', 'INACTIVE', 'EXPIRED',
+                        'VALIDATION_TIMED_OUT', 'REVOKED', 'FAILED']
+LIST_FILTERS = {'Includes': {'keyTypes': KEY_TYPES}, 'CertificateStatuses': CERTIFICATE_STATUSES}
+
+# Expiry buckets from most to least urgent, and the ones that need attention
+EXPIRY_STATUSES = ['Expired', 'Expires Soon (30 days)', 'Expires Soon (60 days)', 'Valid', 'Unknown']
+ATTENTION_STATUSES = {'Expired', 'Expires Soon (30 days)', 'Expires Soon (60 days)'}
+
+# Report column order
+COLUMNS = ["Account", "DomainName", "Status", "ExpiryStatus", "DaysUntilExpiry", 
+           "NotAfter", "Type", "SubjectAlternativeNames", "KeyAlgorithm", 
+           "SignatureAlgorithm", "RenewalEligibility", "Recommendation",
+           "CertificateArn", "CreatedAt", "IssuedAt", "NotBefore", 
+           "KeyUsages", "ExtendedKeyUsages"]
+
+# Defaults for fields a describe result or summary may omit
+CERTIFICATE_DEFAULTS = {
+    'DomainName': 'N/A', 'SubjectAlternativeNames': None, 'SubjectAlternativeNameSummaries': [],
+    'Status': 'N/A', 'CreatedAt': 'N/A', 'IssuedAt': 'N/A', 'NotBefore': 'N/A', 'NotAfter': 'N/A',
+    'KeyAlgorithm': 'N/A', 'SignatureAlgorithm': 'N/A', 'KeyUsages': [], 'ExtendedKeyUsages': [],
+    'Type': 'N/A', 'RenewalEligibility': 'N/A'
+}
+get_certificate_fields = itemgetter(*CERTIFICATE_DEFAULTS)
+
+
+def format_timestamp(value):
+    """Render a boto3 timestamp the way the AWS CLI prints it"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def usage_name(usage):
+    """Return a key usage name from a describe ({'Name': ...}) or summary (plain string) entry"""
+    return usage.get('Name', '') if isinstance(usage, dict) else usage
 
-def get_acm_certificates(account_profile, all_data):
-    """Get ACM certificates for a given AWS profile"""
-    command = [
-        "aws", "acm", "list-certificates",
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
 
+def process_certificate(cert_arn, certificate):
+    """Build the report row from a described certificate or a list_certificates summary"""
+    # Extract certificate details in one lookup, defaults filling missing fields
+    (domain_name, subject_alt_names, san_summaries, status, created_at, issued_at, not_before,
+     not_after, key_algorithm, signature_algorithm, key_usages, extended_key_usages,
+     certificate_type, renewal_eligibility) = get_certificate_fields({**CERTIFICATE_DEFAULTS, **certificate})
+    subject_alt_names = subject_alt_names or san_summaries
+
+    return {
+        'CertificateArn': cert_arn,
+        'DomainName': domain_name,
+        'SubjectAlternativeNames': ', '.join(subject_alt_names) if subject_alt_names else 'None',
+        'Status': status,
+        'Type': certificate_type,
+        'KeyAlgorithm': key_algorithm,
+        'SignatureAlgorithm': signature_algorithm,
+        'CreatedAt': format_timestamp(created_at),
+        'IssuedAt': format_timestamp(issued_at),
+        'NotBefore': format_timestamp(not_before),
+        'NotAfter': format_timestamp(not_after),
+        'RenewalEligibility': renewal_eligibility,
+        'KeyUsages': ', '.join([usage_name(ku) for ku in key_usages]) if key_usages else 'None',
+        'ExtendedKeyUsages': ', '.join([usage_name(eku) for eku in extended_key_usages]) if extended_key_usages else 'None'
+    }
+
+
+def add_expiry_analysis(df):
+    """Add DaysUntilExpiry, ExpiryStatus and Recommendation columns in one vectorized pass"""
+    expiry_dates = pd.to_datetime(df['NotAfter'], utc=True, errors='coerce')
+    days_until_expiry = (expiry_dates - pd.Timestamp.now(tz='UTC')).dt.days
+
+    # Bins are right-inclusive: <0, 0-30, 31-60, >60 days
+    expiry_status = pd.cut(
+        days_until_expiry,
+        bins=[-np.inf, -1, 30, 60, np.inf],
+        labels=EXPIRY_STATUSES[:-1],
+        ordered=True
+    ).cat.set_categories(EXPIRY_STATUSES, ordered=True).fillna('Unknown')
+
+    df['DaysUntilExpiry'] = days_until_expiry.astype('Int64')
+    df['ExpiryStatus'] = expiry_status
+    df['Recommendation'] = np.select(
+        [
+            expiry_status == 'Expired',
+            expiry_status == 'Expires Soon (30 days)',
+            expiry_status == 'Expires Soon (60 days)',
+            df['Status'] != 'ISSUED'
+        ],
+        [
+            'Certificate expired - immediate renewal required',
+            'Renew certificate immediately',
+            'Plan certificate renewal',
+            'Certificate status is ' + df['Status'].astype(str) + ' - review required'
+        ],
+        default='No immediate action needed'
+    )
+    return df
+
+
+def describe_certificate_row(client, cache, account_profile, cert_arn):
+    """Describe one certificate and build its report row; None if the call fails"""
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            certificates = data.get('CertificateSummaryList', [])
-            
-            if certificates:
-                detailed_certs = []
-                
-                for cert in certificates:
-                    cert_arn = cert.get('CertificateArn')
-                    
-                    # Get detailed certificate information
-                    detail_command = [
-                        "aws", "acm", "describe-certificate",
-                        "--certificate-arn", cert_arn,
-                        "--output", "json",
-                        "--profile", account_profile,
-                        "--no-verify-ssl"
-                    ]
-                    
-                    try:
-                        detail_result = subprocess.run(detail_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                        
-                        if detail_result.returncode == 0:
-                            detail_data = json.loads(detail_result.stdout)
-                            certificate = detail_data.get('Certificate', {})
-                            
-                            # Extract certificate details
-                            domain_name = certificate.get('DomainName', 'N/A')
-                            subject_alt_names = certificate.get('SubjectAlternativeNames', [])
-                            status = certificate.get('Status', 'N/A')
-                            created_at = certificate.get('CreatedAt', 'N/A')
-                            issued_at = certificate.get('IssuedAt', 'N/A')
-                            not_before = certificate.get('NotBefore', 'N/A')
-                            not_after = certificate.get('NotAfter', 'N/A')
-                            key_algorithm = certificate.get('KeyAlgorithm', 'N/A')
-                            signature_algorithm = certificate.get('SignatureAlgorithm', 'N/A')
-                            key_usages = certificate.get('KeyUsages', [])
-                            extended_key_usages = certificate.get('ExtendedKeyUsages', [])
-                            certificate_type = certificate.get('Type', 'N/A')
-                            renewal_eligibility = certificate.get('RenewalEligibility', 'N/A')
-                            
-                            # Calculate days until expiration
-                            days_until_expiry = 'N/A'
-                            expiry_status = 'Unknown'
-                            
-                            if not_after != 'N/A':
-                                try:
-                                    if isinstance(not_after, str):
-                                        expiry_date = datetime.fromisoformat(not_after.replace('Z', '+00:00'))
-                                    else:
-                                        expiry_date = not_after.replace(tzinfo=timezone.utc)
-                                    
-                                    current_time = datetime.now(timezone.utc)
-                                    days_until_expiry = (expiry_date - current_time).days
-                                    
-                                    if days_until_expiry < 0:
-                                        expiry_status = 'Expired'
-                                    elif days_until_expiry <= 30:
-                                        expiry_status = 'Expires Soon (30 days)'
-                                    elif days_until_expiry <= 60:
-                                        expiry_status = 'Expires Soon (60 days)'
-                                    else:
-                                        expiry_status = 'Valid'
-                                except:
-                                    days_until_expiry = 'Parse Error'
-                                    expiry_status = 'Unknown'
-                            
-                            # Generate recommendations
-                            if expiry_status == 'Expired':
-                                recommendation = 'Certificate expired - immediate renewal required'
-                            elif expiry_status == 'Expires Soon (30 days)':
-                                recommendation = 'Renew certificate immediately'
-                            elif expiry_status == 'Expires Soon (60 days)':
-                                recommendation = 'Plan certificate renewal'
-                            elif status != 'ISSUED':
-                                recommendation = f'Certificate status is {status} - review required'
-                            else:
-                                recommendation = 'No immediate action needed'
-                            
-                            detailed_certs.append({
-                                'CertificateArn': cert_arn,
-                                'DomainName': domain_name,
-                                'SubjectAlternativeNames': ', '.join(subject_alt_names) if subject_alt_names else 'None',
-                                'Status': status,
-                                'Type': certificate_type,
-                                'KeyAlgorithm': key_algorithm,
-                                'SignatureAlgorithm': signature_algorithm,
-                                'CreatedAt': created_at,
-                                'IssuedAt': issued_at,
-                                'NotBefore': not_before,
-                                'NotAfter': not_after,
-                                'DaysUntilExpiry': days_until_expiry,
-                                'ExpiryStatus': expiry_status,
-                                'RenewalEligibility': renewal_eligibility,
-                                'KeyUsages': ', '.join([ku.get('Name', '') for ku in key_usages]) if key_usages else 'None',
-                                'ExtendedKeyUsages': ', '.join([eku.get('Name', '') for eku in extended_key_usages]) if extended_key_usages else 'None',
-                                'Recommendation': recommendation
-                            })
-                    except Exception as e:
-                        print(f"Error getting details for certificate {cert_arn}: {e}")
-                
-                if detailed_certs:
-                    df = pd.DataFrame(detailed_certs)
-                    df["Account"] = account_profile
-                    
-                    # Reorder columns
-                    columns = ["Account", "DomainName", "Status", "ExpiryStatus", "DaysUntilExpiry", 
-                              "NotAfter", "Type", "SubjectAlternativeNames", "KeyAlgorithm", 
-                              "SignatureAlgorithm", "RenewalEligibility", "Recommendation",
-                              "CertificateArn", "CreatedAt", "IssuedAt", "NotBefore", 
-                              "KeyUsages", "ExtendedKeyUsages"]
-                    
-                    df = df[columns]
-                    all_data.append(df)
-                    print(f"ACM certificates for {account_profile}: {len(detailed_certs)} certificates")
-            else:
-                print(f"No ACM certificates found for {account_profile}")
+        certificate = cache.fetch(account_profile, 'acm.describe_certificate',
+                                  partial(client.describe_certificate, CertificateArn=cert_arn),
+                                  CertificateArn=cert_arn).get('Certificate', {})
+        row = process_certificate(cert_arn, certificate)
+        row['Account'] = account_profile
+        return row
+    except Exception as e:
+        print(f"Error getting details for certificate {cert_arn}: {e}")
+        return None
+
+
+def get_acm_certificates(account_profile, cache=None, detailed=False):
+    """Get ACM certificates for a given AWS profile"""
+    cache = cache or ResponseCache()
+    try:
+        client = get_client(account_profile, 'acm')
+
+        summaries = cache.fetch(account_profile, 'acm.list_certificates', lambda: [
+            cert
+            for page in client.get_paginator('list_certificates').paginate(**LIST_FILTERS)
+            for cert in page.get('CertificateSummaryList', [])
+        ], **LIST_FILTERS)
+
+        if summaries and not detailed:
+            # The summaries already carry dates, status, key and renewal details
+            rows = []
+            for summary in summaries:
+                row = process_certificate(summary['CertificateArn'], summary)
+                row['Account'] = account_profile
+                rows.append(row)
+            print(f"ACM certificates for {account_profile}: {len(rows)} certificates")
+            return rows
+
+        if summaries:
+            cert_arns = [summary['CertificateArn'] for summary in summaries]
+
+            # Describe calls are network-bound, so overlap them on a thread pool;
+            # map keeps the rows in list_certificates order
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                results = executor.map(
+                    partial(describe_certificate_row, client, cache, account_profile), cert_arns)
+                detailed_certs = [row for row in results if row is not None]
+
+            if detailed_certs:
+                print(f"ACM certificates for {account_profile}: {len(detailed_certs)} certificates")
+            return detailed_certs
         else:
-            print(f"Error retrieving ACM certificates for {account_profile}: {result.stderr}")
+            print(f"No ACM certificates found for {account_profile}")
     except Exception as e:
         print(f"Error for {account_profile}: {e}")
+    return []
 
 
 if __name__ == "__main__":
-    all_data = []
+    parser = argparse.ArgumentParser(description="ACM certificate inventory across AWS accounts")
+    parser.add_argument("--detailed", action="store_true",
+                        help="Describe every certificate for SignatureAlgorithm and full SAN lists")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, force=args.force)
 
     # Load profiles from JSON file
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            aws_profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json not found. Using default profiles.")
-        aws_profiles = ["default"]
+    aws_profiles = load_profiles()
 
     print("Starting ACM certificate inventory...")
-    
-    for profile in aws_profiles:
-        print(f"\nProcessing profile: {profile}")
-        get_acm_certificates(account_profile=profile, all_data=all_data)
+
+    # Accounts are fetched concurrently on threads
+    results = map_profiles(partial(get_acm_certificates, cache=cache, detailed=args.detailed), aws_profiles)
+    all_data = []
+    for rows in results:
+        all_data.extend(rows)
 
     # Generate comprehensive report
     if all_data:
         timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
         filename = f"acm_certificates_{timestamp}.xlsx"
 
-        final_df = pd.concat(all_data, ignore_index=True)
+        final_df = add_expiry_analysis(pd.DataFrame.from_records(all_data, columns=COLUMNS))
+        attention_mask = final_df['ExpiryStatus'].isin(ATTENTION_STATUSES)
         
-        with pd.ExcelWriter(filename) as writer:
-            # Main certificates data
-            final_df.to_excel(writer, index=False, sheet_name="ACM_Certificates")
-            
-            # Expiry status summary
-            expiry_summary = final_df.groupby(['Account', 'ExpiryStatus']).agg({
-                'CertificateArn': 'count'
-            }).reset_index()
-            expiry_summary.columns = ['Account', 'ExpiryStatus', 'Count']
-            expiry_summary.to_excel(writer, index=False, sheet_name="Expiry_Summary")
-            
-            # Certificates expiring soon
-            expiring_soon = final_df[final_df['ExpiryStatus'].str.contains('Expires Soon|Expired')]
-            if not expiring_soon.empty:
-                expiring_soon.to_excel(writer, index=False, sheet_name="Expiring_Soon")
-            
-            # Certificate status summary
-            status_summary = final_df.groupby(['Account', 'Status']).agg({
-                'CertificateArn': 'count'
-            }).reset_index()
-            status_summary.columns = ['Account', 'Status', 'Count']
-            status_summary.to_excel(writer, index=False, sheet_name="Status_Summary")
+        sheets = {"ACM_Certificates": final_df}
+
+        # Expiry status summary
+        expiry_summary = final_df.groupby(['Account', 'ExpiryStatus'], observed=True).agg({
+            'CertificateArn': 'count'
+        }).reset_index()
+        expiry_summary.columns = ['Account', 'ExpiryStatus', 'Count']
+        sheets["Expiry_Summary"] = expiry_summary
+
+        # Certificates expiring soon
+        expiring_soon = final_df[attention_mask]
+        if not expiring_soon.empty:
+            sheets["Expiring_Soon"] = expiring_soon
+
+        # Certificate status summary
+        status_summary = final_df.groupby(['Account', 'Status']).agg({
+            'CertificateArn': 'count'
+        }).reset_index()
+        status_summary.columns = ['Account', 'Status', 'Count']
+        sheets["Status_Summary"] = status_summary
+
+        # Sheets are streamed to disk row by row in xlsxwriter constant_memory mode
+        write_xlsx(filename, sheets)
 
         print(f"\nACM certificate inventory saved to: {filename}")
         print(f"Total certificates found: {len(final_df)}")
@@ -224,11 +259,12 @@ if __name__ == "__main__":
         
         print("\nExpiry Status Summary:")
         expiry_counts = final_df['ExpiryStatus'].value_counts()
+        expiry_counts = expiry_counts[expiry_counts > 0]
         for status, count in expiry_counts.items():
             print(f"  {status}: {count} certificates")
         
         # Highlight certificates needing attention
-        attention_needed = len(final_df[final_df['ExpiryStatus'].str.contains('Expires Soon|Expired')])
+        attention_needed = int(attention_mask.sum())
         if attention_needed > 0:
             print(f"\n*** {attention_needed} certificates need immediate attention! ***")
     else:
@@ -12,158 +12,182 @@ Features:
 
 Requirements:
 - AWS CLI configured with profiles for each account
-- Python packages: pandas, subprocess, json
+- Python packages: pandas, boto3, xlsxwriter
 - Proper IAM permissions for EC2 describe operations
 
 How to run:
 1. Ensure virtual environment is activated: .venv\Scripts\activate
-2. Install dependencies: pip install pandas
+2. Install dependencies: pip install pandas boto3 xlsxwriter
 3. Configure AWS profiles in aws_profiles.json
 4. Run script: python AMI.py
+   Optional: --parquet to write a Parquet file instead of Excel (pip install pyarrow)
+   Optional: --include-all-states to also report pending, failed and deregistered AMIs
+   Optional: --cache-dir .aws_cache to reuse responses from recent runs (--force to refresh)
 
 Output:
 - Excel file with timestamp containing AMI inventory data
 - Console output showing progress for each account processed
 """
 
-import subprocess
-import json
+import argparse
 import pandas as pd
 from datetime import datetime
-
-
-def describe_amis(account_profile, all_data):
-    """Get AMI details for the specified account profile"""
-    command = [
-        "aws", "ec2", "describe-images",
-        "--owners", "self",
-        "--query", (
-            "Images[*].{"
-            "ImageId:ImageId,"
-            "Name:Name,"
-            "Description:Description,"
-            "Architecture:Architecture,"
-            "State:State,"
-            "Public:Public,"
-            "OwnerId:OwnerId,"
-            "CreationDate:CreationDate,"
-            "Platform:Platform,"
-            "PlatformDetails:PlatformDetails,"
-            "VirtualizationType:VirtualizationType,"
-            "RootDeviceType:RootDeviceType,"
-            "RootDeviceName:RootDeviceName,"
-            "ImageType:ImageType,"
-            "KernelId:KernelId,"
-            "RamdiskId:RamdiskId,"
-            "SriovNetSupport:SriovNetSupport,"
-            "EnaSupport:EnaSupport,"
-            "BootMode:BootMode,"
-            "TpmSupport:TpmSupport,"
-            "DeprecationTime:DeprecationTime,"
-            "BlockDeviceMappings:BlockDeviceMappings,"
-            "Tags:Tags}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
+from functools import partial
+from aws_cache import ResponseCache, add_cache_arguments
+from aws_session import get_client, map_profiles
+from profiles import load_profiles
+from report_utils import write_parquet, write_xlsx
+
+# describe_images accepts up to 1000 results per page
+PAGE_SIZE = 1000
+# Only usable images are reported unless --include-all-states is given
+AVAILABLE_FILTERS = [{'Name': 'state', 'Values': ['available']}]
+
+# Scalar image fields copied straight into the report
+AMI_FIELDS = [
+    'ImageId', 'Name', 'Description', 'Architecture', 'State', 'Public', 'OwnerId',
+    'CreationDate', 'Platform', 'PlatformDetails', 'VirtualizationType', 'RootDeviceType',
+    'RootDeviceName', 'ImageType', 'KernelId', 'RamdiskId', 'SriovNetSupport', 'EnaSupport',
+    'BootMode', 'TpmSupport', 'DeprecationTime'
+]
+# Report column -> tag key
+TAG_COLUMNS = {
+    'Environment': 'Environment',
+    'Application': 'Application',
+    'Owner': 'Owner',
+    'CostCentre': 'Cost Centre',
+    'Project': 'Project'
+}
+COLUMNS = AMI_FIELDS + ['BlockDevices', 'SnapshotIds'] + list(TAG_COLUMNS) + ['Account']
+# Low-cardinality columns stored as categories; everything else stays as built
+AMI_DTYPES = {
+    'Architecture': 'category',
+    'State': 'category',
+    'Public': 'bool',
+    'Platform': 'category',
+    'PlatformDetails': 'category',
+    'VirtualizationType': 'category',
+    'RootDeviceType': 'category',
+    'ImageType': 'category',
+    'BootMode': 'category',
+    'Account': 'category'
+}
+
+
+def format_block_devices(block_devices):
+    """Summarise EBS block device mappings as device:size:type:encryption"""
+    if not isinstance(block_devices, list):
+        return ''
+    device_info = []
+    for device in block_devices:
+        ebs = device.get('Ebs', {})
+        if ebs:
+            encrypted = 'Encrypted' if ebs.get('Encrypted', False) else 'Unencrypted'
+            device_info.append(f"{device.get('DeviceName', '')}:{ebs.get('VolumeSize', '')}GB:"
+                               f"{ebs.get('VolumeType', '')}:{encrypted}")
+    return ', '.join(device_info)
+
+
+def format_snapshot_ids(block_devices):
+    """Join the snapshot IDs backing an image's EBS volumes"""
+    if not isinstance(block_devices, list):
+        return ''
+    return ', '.join(device['Ebs']['SnapshotId'] for device in block_devices
+                     if device.get('Ebs', {}).get('SnapshotId'))
+
+
+def build_ami_frame(images):
+    """Flatten raw describe_images records into the report frame"""
+    # Scalar fields are copied by json_normalize; only the nested columns need Python
+    df = pd.json_normalize(images, max_level=0).reindex(
+        columns=AMI_FIELDS + ['BlockDeviceMappings', 'Tags', 'Account'])
+    df[AMI_FIELDS] = df[AMI_FIELDS].fillna('')
+    df['Public'] = df['Public'].replace('', False)
+
+    df['BlockDevices'] = df['BlockDeviceMappings'].map(format_block_devices)
+    df['SnapshotIds'] = df['BlockDeviceMappings'].map(format_snapshot_ids)
+
+    tag_dicts = df['Tags'].map(lambda tags: {tag['Key']: tag['Value'] for tag in tags}
+                               if isinstance(tags, list) else {})
+    tags_df = pd.json_normalize(tag_dicts.tolist(), max_level=0).reindex(
+        columns=list(TAG_COLUMNS.values()), fill_value='').fillna('')
+    tags_df.columns = list(TAG_COLUMNS)
+    tags_df.index = df.index
+
+    return pd.concat([df, tags_df], axis=1)[COLUMNS]
+
+
+def iter_image_pages(ec2, account_profile, cache, filters):
+    """Yield describe_images results one page at a time"""
+    paginator = ec2.get_paginator('describe_images')
+    # Request full-size pages to minimise round-trips
+    pages = paginator.paginate(Owners=['self'], Filters=filters, PaginationConfig={'PageSize': PAGE_SIZE})
+    if not cache.cache_dir:
+        for page in pages:
+            yield page.get('Images', [])
+        return
+
+    # A cache entry holds the whole response, so replay it in page-sized slices
+    images = cache.fetch(account_profile, 'ec2.describe_images', lambda: [
+        image for page in pages for image in page.get('Images', [])
+    ], Owners=['self'], Filters=filters)
+    for start in range(0, len(images), PAGE_SIZE):
+        yield images[start:start + PAGE_SIZE]
+
+
+def describe_amis(account_profile, cache=None, include_all_states=False):
+    """Get the AMI report frame for the specified account profile"""
+    cache = cache or ResponseCache()
+    filters = [] if include_all_states else AVAILABLE_FILTERS
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            
-            # Process the data
-            processed_data = []
-            for ami in data:
-                # Extract tag values
-                tags = ami.get('Tags', [])
-                tag_dict = {tag['Key']: tag['Value'] for tag in tags} if tags else {}
-                
-                # Process block device mappings
-                block_devices = ami.get('BlockDeviceMappings', [])
-                device_info = []
-                snapshot_ids = []
-                
-                for device in block_devices:
-                    device_name = device.get('DeviceName', '')
-                    ebs = device.get('Ebs', {})
-                    if ebs:
-                        snapshot_id = ebs.get('SnapshotId', '')
-                        volume_size = ebs.get('VolumeSize', '')
-                        volume_type = ebs.get('VolumeType', '')
-                        encrypted = ebs.get('Encrypted', False)
-                        
-                        device_info.append(f"{device_name}:{volume_size}GB:{volume_type}:{'Encrypted' if encrypted else 'Unencrypted'}")
-                        if snapshot_id:
-                            snapshot_ids.append(snapshot_id)
-                
-                processed_ami = {
-                    'ImageId': ami.get('ImageId', ''),
-                    'Name': ami.get('Name', ''),
-                    'Description': ami.get('Description', ''),
-                    'Architecture': ami.get('Architecture', ''),
-                    'State': ami.get('State', ''),
-                    'Public': ami.get('Public', False),
-                    'OwnerId': ami.get('OwnerId', ''),
-                    'CreationDate': ami.get('CreationDate', ''),
-                    'Platform': ami.get('Platform', ''),
-                    'PlatformDetails': ami.get('PlatformDetails', ''),
-                    'VirtualizationType': ami.get('VirtualizationType', ''),
-                    'RootDeviceType': ami.get('RootDeviceType', ''),
-                    'RootDeviceName': ami.get('RootDeviceName', ''),
-                    'ImageType': ami.get('ImageType', ''),
-                    'KernelId': ami.get('KernelId', ''),
-                    'RamdiskId': ami.get('RamdiskId', ''),
-                    'SriovNetSupport': ami.get('SriovNetSupport', ''),
-                    'EnaSupport': ami.get('EnaSupport', ''),
-                    'BootMode': ami.get('BootMode', ''),
-                    'TpmSupport': ami.get('TpmSupport', ''),
-                    'DeprecationTime': ami.get('DeprecationTime', ''),
-                    'BlockDevices': ', '.join(device_info),
-                    'SnapshotIds': ', '.join(snapshot_ids),
-                    'Environment': tag_dict.get('Environment', ''),
-                    'Application': tag_dict.get('Application', ''),
-                    'Owner': tag_dict.get('Owner', ''),
-                    'CostCentre': tag_dict.get('Cost Centre', ''),
-                    'Project': tag_dict.get('Project', ''),
-                    'Account': account_profile
-                }
-                processed_data.append(processed_ami)
-
-            if processed_data:
-                df = pd.DataFrame(processed_data)
-                all_data.append(df)
-                print(f"AMI details for {account_profile} added ({len(processed_data)} AMIs).")
-            else:
-                print(f"No AMIs found for {account_profile}.")
-        else:
-            print(f"Error running AWS CLI command for {account_profile}: {result.stderr}")
+        ec2 = get_client(account_profile, 'ec2')
+
+        # Flatten each page as it arrives so raw image records never pile up
+        frames = []
+        for images in iter_image_pages(ec2, account_profile, cache, filters):
+            if not images:
+                continue
+            for ami in images:
+                ami['Account'] = account_profile
+            frames.append(build_ami_frame(images))
+
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+            print(f"AMI details for {account_profile} added ({len(df)} AMIs).")
+            return df
+        print(f"No AMIs found for {account_profile}.")
     except Exception as e:
         print(f"An error occurred for {account_profile}: {e}")
+    return None
 
 
 if __name__ == "__main__":
-    all_data = []
+    parser = argparse.ArgumentParser(description="AMI inventory across AWS accounts")
+    add_cache_arguments(parser)
+    parser.add_argument("--include-all-states", action="store_true",
+                        help="Report AMIs in every state, not just available ones")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Write a zstd-compressed Parquet file instead of Excel (requires pyarrow)")
+    args = parser.parse_args()
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, force=args.force)
 
     # Load AWS profiles from external file
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            aws_profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json not found, using default profiles")
-        aws_profiles = ["shared"]
+    aws_profiles = load_profiles()
 
-    for profile in aws_profiles:
-        describe_amis(account_profile=profile, all_data=all_data)
+    # Accounts are fetched concurrently on threads
+    results = map_profiles(partial(describe_amis, cache=cache, include_all_states=args.include_all_states), aws_profiles)
+    frames = [df for df in results if df is not None]
 
-    if all_data:
+    if frames:
         timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
-        filename = f"ami_inventory_{timestamp}.xlsx"
+        filename = f"ami_inventory_{timestamp}.{'parquet' if args.parquet else 'xlsx'}"
 
-        final_df = pd.concat(all_data, ignore_index=True)
-        final_df.to_excel(filename, index=False, sheet_name="AMI_Inventory")
+        # Categories are applied after the concat so every account shares one set
+        final_df = pd.concat(frames, ignore_index=True).astype(AMI_DTYPES, copy=False)
+        if args.parquet:
+            write_parquet(filename, final_df)
+        else:
+            write_xlsx(filename, {"AMI_Inventory": final_df})
 
         print(f"AMI inventory saved to {filename}")
         print(f"Total AMIs found: {len(final_df)}")
@@ -9,87 +9,84 @@ Setup:
 1. Configure AWS profiles in aws_profiles.json
 2. Ensure AWS CLI is configured with proper permissions
 3. Run script: python CloudFront.py
+   Optional: --parquet to write a Parquet file instead of Excel (pip install pyarrow)
+   Optional: --cache-dir .aws_cache to reuse responses from recent runs (--force to refresh)
 
 Output:
 - Excel file with timestamp containing CloudFront distributions data
 - Console output showing progress for each account processed
 """
 
-import subprocess
-import json
+import argparse
 import pandas as pd
 from datetime import datetime
+from functools import partial
+from aws_cache import ResponseCache, add_cache_arguments
+from aws_session import get_client, map_profiles
+from profiles import load_profiles
+from report_utils import write_parquet, write_xlsx
 
-def get_cloudfront_distributions(account_profile):
+# Distributions requested per list_distributions page
+PAGE_SIZE = 100
+# CloudFront is a global service; its tags are served from us-east-1
+CLOUDFRONT_TAG_REGION = 'us-east-1'
+
+# DistributionSummary fields kept for the report
+DISTRIBUTION_FIELDS = [
+    'Id', 'ARN', 'Status', 'LastModifiedTime', 'DomainName', 'Comment', 'Enabled',
+    'PriceClass', 'HttpVersion', 'IsIPV6Enabled', 'WebACLId', 'Origins',
+    'DefaultCacheBehavior', 'CacheBehaviors', 'CustomErrorResponses', 'Logging',
+    'ViewerCertificate', 'Restrictions', 'Aliases'
+]
+# Fields returned as {'Quantity': n, 'Items': [...]} wrappers
+WRAPPED_FIELDS = ['Origins', 'CacheBehaviors', 'CustomErrorResponses', 'Aliases']
+
+def project_distribution(item):
+    """Select the report fields from a DistributionSummary, unwrapping Quantity/Items lists."""
+    record = {field: item.get(field) for field in DISTRIBUTION_FIELDS}
+    for field in WRAPPED_FIELDS:
+        value = record[field]
+        record[field] = value.get('Items', []) if isinstance(value, dict) else []
+    if isinstance(record['LastModifiedTime'], datetime):
+        record['LastModifiedTime'] = record['LastModifiedTime'].isoformat()
+    return record
+
+def get_cloudfront_distributions(account_profile, cache):
     """Retrieve CloudFront distributions for an account."""
     print(f"Checking CloudFront distributions for account: {account_profile}")
 
-    command = [
-        "aws", "cloudfront", "list-distributions",
-        "--query", (
-            "DistributionList.Items[*].{"
-            "Id:Id,"
-            "ARN:ARN,"
-            "Status:Status,"
-            "LastModifiedTime:LastModifiedTime,"
-            "DomainName:DomainName,"
-            "Comment:Comment,"
-            "Enabled:Enabled,"
-            "PriceClass:PriceClass,"
-            "HttpVersion:HttpVersion,"
-            "IsIPV6Enabled:IsIPV6Enabled,"
-            "WebACLId:WebACLId,"
-            "Origins:Origins,"
-            "DefaultCacheBehavior:DefaultCacheBehavior,"
-            "CacheBehaviors:CacheBehaviors,"
-            "CustomErrorResponses:CustomErrorResponses,"
-            "Logging:Logging,"
-            "ViewerCertificate:ViewerCertificate,"
-            "Restrictions:Restrictions,"
-            "Aliases:Aliases}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            if data:
-                print(f"  Found {len(data)} CloudFront distributions")
-                return data
-            else:
-                print(f"  No CloudFront distributions found")
-                return []
+        client = get_client(account_profile, 'cloudfront')
+
+        paginator = client.get_paginator('list_distributions')
+        data = cache.fetch(account_profile, 'cloudfront.list_distributions', lambda: [
+            project_distribution(item)
+            for page in paginator.paginate(PaginationConfig={'PageSize': PAGE_SIZE})
+            for item in page.get('DistributionList', {}).get('Items', [])
+        ])
+
+        if data:
+            print(f"  Found {len(data)} CloudFront distributions")
         else:
-            print(f"  Error retrieving CloudFront data: {result.stderr}")
-            return []
+            print(f"  No CloudFront distributions found")
+        return data
     except Exception as e:
-        print(f"  Error processing CloudFront data: {e}")
+        print(f"  Error retrieving CloudFront data: {e}")
         return []
 
-def get_distribution_tags(distribution_id, account_profile):
-    """Get tags for a specific distribution."""
-    command = [
-        "aws", "cloudfront", "list-tags-for-resource",
-        "--resource", f"arn:aws:cloudfront::{distribution_id}:distribution/{distribution_id}",
-        "--query", "Tags.Items[*].{Key:Key,Value:Value}",
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
+def get_distribution_tags(account_profile, cache):
+    """Get tags for every distribution in an account, keyed by distribution ARN."""
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        else:
-            return []
-    except Exception:
-        return []
+        client = get_client(account_profile, 'resourcegroupstaggingapi', region_name=CLOUDFRONT_TAG_REGION)
+        paginator = client.get_paginator('get_resources')
+        return cache.fetch(account_profile, 'tagging.get_resources', lambda: {
+            resource['ResourceARN']: resource.get('Tags', [])
+            for page in paginator.paginate(ResourceTypeFilters=['cloudfront:distribution'])
+            for resource in page.get('ResourceTagMappingList', [])
+        }, ResourceTypeFilters=['cloudfront:distribution'])
+    except Exception as e:
+        print(f"  Error retrieving CloudFront tags: {e}")
+        return {}
 
 def extract_origins_info(origins):
     """Extract origin information."""
@@ -137,20 +134,13 @@ def extract_tags_info(tags):
     if not tags:
         return "", ""
     
-    name = ""
-    tags_str = ""
-    
-    for tag in tags:
-        if tag.get('Key') == 'Name':
-            name = tag.get('Value', '')
-        tags_str += f"{tag.get('Key', '')}:{tag.get('Value', '')}; "
+    name = next((tag.get('Value', '') for tag in tags if tag.get('Key') == 'Name'), "")
+    tags_str = '; '.join(f"{tag.get('Key', '')}:{tag.get('Value', '')}" for tag in tags)
     
-    return name, tags_str.rstrip('; ')
+    return name, tags_str
 
-def process_distribution(dist, account_profile):
+def process_distribution(dist, tags, account_profile):
     """Process a single CloudFront distribution."""
-    # Get tags for this distribution
-    tags = get_distribution_tags(dist.get('Id', ''), account_profile)
     name, tags_str = extract_tags_info(tags)
     
     # Extract origins information
@@ -200,44 +190,51 @@ def process_distribution(dist, account_profile):
         'ARN': dist.get('ARN')
     }
 
+def collect_account_distributions(account_profile, cache=None):
+    """Retrieve and process all CloudFront distributions for an account."""
+    cache = cache or ResponseCache()
+    distributions = get_cloudfront_distributions(account_profile, cache)
+    if not distributions:
+        return []
+
+    # One bulk tagging call replaces a tag lookup per distribution
+    tag_map = get_distribution_tags(account_profile, cache)
+    return [process_distribution(dist, tag_map.get(dist.get('ARN'), []), account_profile)
+            for dist in distributions]
+
 def main():
-    # Load AWS profiles
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json file not found. Please create it with your AWS profiles.")
-        return
-    except json.JSONDecodeError:
-        print("Error reading aws_profiles.json. Please check the file format.")
-        return
+    parser = argparse.ArgumentParser(description="CloudFront inventory across AWS accounts")
+    add_cache_arguments(parser)
+    parser.add_argument("--parquet", action="store_true",
+                        help="Write a zstd-compressed Parquet file instead of Excel (requires pyarrow)")
+    args = parser.parse_args()
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, force=args.force)
 
-    all_data = []
+    # Load AWS profiles
+    profiles = load_profiles()
 
     print("Starting CloudFront inventory across all accounts...")
     print("=" * 60)
 
-    for profile in profiles:
-        print(f"\nProcessing account: {profile}")
-        print("-" * 40)
-        
-        # Get CloudFront distributions
-        distributions = get_cloudfront_distributions(profile)
-        
-        for dist in distributions:
-            processed_dist = process_distribution(dist, profile)
-            all_data.append(processed_dist)
+    # Accounts are fetched concurrently on threads
+    results = map_profiles(partial(collect_account_distributions, cache=cache), profiles)
+    all_data = []
+    for rows in results:
+        all_data.extend(rows)
 
     # Create Excel file with timestamp
     timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
-    filename = f"cloudfront_inventory_{timestamp}.xlsx"
+    filename = f"cloudfront_inventory_{timestamp}.{'parquet' if args.parquet else 'xlsx'}"
 
-    print(f"\nCreating Excel file: {filename}")
+    print(f"\nCreating {'Parquet' if args.parquet else 'Excel'} file: {filename}")
     print("=" * 60)
 
     if all_data:
-        df = pd.DataFrame(all_data)
-        df.to_excel(filename, index=False)
+        df = pd.DataFrame.from_records(all_data)
+        if args.parquet:
+            write_parquet(filename, df)
+        else:
+            write_xlsx(filename, {"Sheet1": df})
         print(f"CloudFront distributions saved to {filename}")
         print(f"Total CloudFront distributions found: {len(all_data)}")
         
@@ -264,8 +261,11 @@ def main():
             for origin_type, count in origin_types.items():
                 print(f"  * {origin_type}: {count}")
     else:
-        # Create empty Excel file
-        pd.DataFrame().to_excel(filename, index=False)
+        # Create empty output file
+        if args.parquet:
+            pd.DataFrame().to_parquet(filename, index=False)
+        else:
+            write_xlsx(filename, {"Sheet1": pd.DataFrame()})
         print("No CloudFront distributions found across all accounts")
 
     print(f"\nCloudFront inventory completed successfully!")
@@ -10,121 +10,118 @@ Features:
 
 Requirements:
 - AWS CLI configured with profiles for each account
-- Python packages: pandas, subprocess, json
+- Python packages: pandas, boto3, xlsxwriter
 - Proper IAM permissions for DynamoDB describe operations
 
 How to run:
 1. Ensure virtual environment is activated: .venv\Scripts\activate
-2. Install dependencies: pip install pandas
+2. Install dependencies: pip install pandas boto3 xlsxwriter
 3. Configure AWS profiles in aws_profiles.json
 4. Run script: python DynamoDB.py
+   Optional: --parquet to write a Parquet file instead of Excel (pip install pyarrow)
 
 Output:
 - Excel file with timestamp containing DynamoDB inventory data
 - Console output showing progress for each account processed
 """
 
-import subprocess
-import json
+import argparse
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from profiles import load_profiles
+from aws_session import get_client, map_profiles
+from report_utils import write_parquet, write_xlsx
+
+MAX_WORKERS = 16
+
+
+def process_table(table_data, account_profile):
+    """Build the report row for a described table"""
+    creation_time = table_data.get('CreationDateTime', '')
+    return {
+        'Account': account_profile,
+        'TableName': table_data.get('TableName', ''),
+        'TableStatus': table_data.get('TableStatus', ''),
+        'CreationDateTime': creation_time.isoformat() if isinstance(creation_time, datetime) else creation_time,
+        'BillingMode': table_data.get('BillingModeSummary', {}).get('BillingMode', ''),
+        'ItemCount': table_data.get('ItemCount', 0),
+        'TableSizeBytes': table_data.get('TableSizeBytes', 0),
+        'ReadCapacityUnits': table_data.get('ProvisionedThroughput', {}).get('ReadCapacityUnits', 0),
+        'WriteCapacityUnits': table_data.get('ProvisionedThroughput', {}).get('WriteCapacityUnits', 0),
+        'GlobalSecondaryIndexes': len(table_data.get('GlobalSecondaryIndexes', [])),
+        'LocalSecondaryIndexes': len(table_data.get('LocalSecondaryIndexes', [])),
+        'StreamSpecification': 'Enabled' if table_data.get('StreamSpecification', {}).get('StreamEnabled') else 'Disabled',
+        'SSEDescription': 'Enabled' if table_data.get('SSEDescription', {}).get('Status') == 'ENABLED' else 'Disabled',
+        'PointInTimeRecovery': 'Unknown',  # Requires separate API call
+        'TableClass': table_data.get('TableClassSummary', {}).get('TableClass', 'STANDARD'),
+        'TableArn': table_data.get('TableArn', ''),
+        'KeySchema': ', '.join([f"{key['AttributeName']}({key['KeyType']})" for key in table_data.get('KeySchema', [])]),
+        'AttributeDefinitions': ', '.join([f"{attr['AttributeName']}:{attr['AttributeType']}" for attr in table_data.get('AttributeDefinitions', [])])
+    }
+
+
+def describe_table_row(client, table_name, account_profile):
+    """Describe one table and build its report row; None if the call fails"""
+    try:
+        return process_table(client.describe_table(TableName=table_name)['Table'], account_profile)
+    except Exception as e:
+        print(f"Error processing table {table_name} for {account_profile}: {e}")
+        return None
 
 
-def get_dynamodb_tables(account_profile, all_data):
+def get_dynamodb_tables(account_profile):
     """Get DynamoDB table details for the specified account profile"""
-    # First get list of tables
-    list_command = [
-        "aws", "dynamodb", "list-tables",
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
+    rows = []
     try:
-        result = subprocess.run(list_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        if result.returncode != 0:
-            print(f"Error listing tables for {account_profile}: {result.stderr}")
-            return
-
-        table_names = json.loads(result.stdout).get('TableNames', [])
-        
-        if not table_names:
+        client = get_client(account_profile, 'dynamodb')
+        table_names = (table_name
+                       for page in client.get_paginator('list_tables').paginate()
+                       for table_name in page.get('TableNames', []))
+
+        # Describe calls are network-bound, so overlap them on a thread pool.
+        # Tables are submitted page by page, so later list pages load while earlier describes run;
+        # map returns the rows in list_tables order.
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = list(executor.map(
+                partial(describe_table_row, client, account_profile=account_profile), table_names))
+
+        if not results:
             print(f"No DynamoDB tables found for {account_profile}.")
-            return
-
-        # Get details for each table
-        for table_name in table_names:
-            describe_command = [
-                "aws", "dynamodb", "describe-table",
-                "--table-name", table_name,
-                "--output", "json",
-                "--profile", account_profile,
-                "--no-verify-ssl"
-            ]
-
-            try:
-                result = subprocess.run(describe_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                
-                if result.returncode == 0:
-                    table_data = json.loads(result.stdout)['Table']
-                    
-                    # Extract key information
-                    processed_table = {
-                        'Account': account_profile,
-                        'TableName': table_data.get('TableName', ''),
-                        'TableStatus': table_data.get('TableStatus', ''),
-                        'CreationDateTime': table_data.get('CreationDateTime', ''),
-                        'BillingMode': table_data.get('BillingModeSummary', {}).get('BillingMode', ''),
-                        'ItemCount': table_data.get('ItemCount', 0),
-                        'TableSizeBytes': table_data.get('TableSizeBytes', 0),
-                        'ReadCapacityUnits': table_data.get('ProvisionedThroughput', {}).get('ReadCapacityUnits', 0),
-                        'WriteCapacityUnits': table_data.get('ProvisionedThroughput', {}).get('WriteCapacityUnits', 0),
-                        'GlobalSecondaryIndexes': len(table_data.get('GlobalSecondaryIndexes', [])),
-                        'LocalSecondaryIndexes': len(table_data.get('LocalSecondaryIndexes', [])),
-                        'StreamSpecification': 'Enabled' if table_data.get('StreamSpecification', {}).get('StreamEnabled') else 'Disabled',
-                        'SSEDescription': 'Enabled' if table_data.get('SSEDescription', {}).get('Status') == 'ENABLED' else 'Disabled',
-                        'PointInTimeRecovery': 'Unknown',  # Requires separate API call
-                        'TableClass': table_data.get('TableClassSummary', {}).get('TableClass', 'STANDARD'),
-                        'TableArn': table_data.get('TableArn', ''),
-                        'KeySchema': ', '.join([f"{key['AttributeName']}({key['KeyType']})" for key in table_data.get('KeySchema', [])]),
-                        'AttributeDefinitions': ', '.join([f"{attr['AttributeName']}:{attr['AttributeType']}" for attr in table_data.get('AttributeDefinitions', [])])
-                    }
-                    
-                    all_data.append(processed_table)
-                    
-                else:
-                    print(f"Error describing table {table_name} for {account_profile}: {result.stderr}")
-                    
-            except Exception as e:
-                print(f"Error processing table {table_name} for {account_profile}: {e}")
-
-        print(f"DynamoDB tables for {account_profile} added ({len(table_names)} tables).")
+            return rows
+
+        rows = [row for row in results if row is not None]
+        print(f"DynamoDB tables for {account_profile} added ({len(results)} tables).")
         
     except Exception as e:
         print(f"An error occurred for {account_profile}: {e}")
+    return rows
 
 
 if __name__ == "__main__":
-    all_data = []
+    parser = argparse.ArgumentParser(description="DynamoDB inventory across AWS accounts")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Write a zstd-compressed Parquet file instead of Excel (requires pyarrow)")
+    args = parser.parse_args()
 
     # Load AWS profiles from external file
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            aws_profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json not found, using default profiles")
-        aws_profiles = ["shared"]
+    aws_profiles = load_profiles()
 
-    for profile in aws_profiles:
-        get_dynamodb_tables(account_profile=profile, all_data=all_data)
+    # Accounts are fetched concurrently on threads
+    all_data = []
+    for rows in map_profiles(get_dynamodb_tables, aws_profiles):
+        all_data.extend(rows)
 
     if all_data:
         timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
-        filename = f"dynamodb_inventory_{timestamp}.xlsx"
+        filename = f"dynamodb_inventory_{timestamp}.{'parquet' if args.parquet else 'xlsx'}"
 
         df = pd.DataFrame(all_data)
-        df.to_excel(filename, index=False, sheet_name="DynamoDB_Inventory")
+        if args.parquet:
+            write_parquet(filename, df)
+        else:
+            write_xlsx(filename, {"DynamoDB_Inventory": df})
 
         print(f"DynamoDB inventory saved to {filename}")
         print(f"Total DynamoDB tables found: {len(df)}")
@@ -12,255 +12,237 @@ Features:
 
 Requirements:
 - AWS CLI configured with profiles for each account
-- Python packages: pandas, subprocess, json
+- Python packages: pandas, boto3
 - Proper IAM permissions for EC2 describe operations
 
 How to run:
 1. Ensure virtual environment is activated: .venv\Scripts\activate
-2. Install dependencies: pip install pandas
+2. Install dependencies: pip install pandas boto3
 3. Configure AWS profiles in aws_profiles.json:
    {
      "profiles": ["account1-profile", "account2-profile", "prod-account"]
    }
 4. Run script: python EC2.py
+   Optional: --parquet to write one Parquet file per sheet instead of Excel (pip install pyarrow)
 
 Output:
 - Excel file with timestamp containing instance and reservation data
 - Console output showing progress for each account processed
 """
 
-import subprocess
-import json
+import jmespath
+import argparse
 import pandas as pd
-
-
-# Function to get RAM for instance types
-def get_instance_memory(instance_type):
-    """Get memory in GiB for common EC2 instance types"""
-    memory_map = {
-        # General Purpose
-        't2.nano': 0.5, 't2.micro': 1, 't2.small': 2, 't2.medium': 4, 't2.large': 8, 't2.xlarge': 16, 't2.2xlarge': 32,
-        't3.nano': 0.5, 't3.micro': 1, 't3.small': 2, 't3.medium': 4, 't3.large': 8, 't3.xlarge': 16, 't3.2xlarge': 32,
-        't3a.nano': 0.5, 't3a.micro': 1, 't3a.small': 2, 't3a.medium': 4, 't3a.large': 8, 't3a.xlarge': 16, 't3a.2xlarge': 32,
-        'm3.medium': 3.75, 'm3.large': 7.5, 'm3.xlarge': 15, 'm3.2xlarge': 30,
-        'm5.large': 8, 'm5.xlarge': 16, 'm5.2xlarge': 32, 'm5.4xlarge': 64, 'm5.8xlarge': 128, 'm5.12xlarge': 192, 'm5.16xlarge': 256, 'm5.24xlarge': 384,
-        'm5a.large': 8, 'm5a.xlarge': 16, 'm5a.2xlarge': 32, 'm5a.4xlarge': 64, 'm5a.8xlarge': 128, 'm5a.12xlarge': 192, 'm5a.16xlarge': 256, 'm5a.24xlarge': 384,
-        'm6i.large': 8, 'm6i.xlarge': 16, 'm6i.2xlarge': 32, 'm6i.4xlarge': 64, 'm6i.8xlarge': 128, 'm6i.12xlarge': 192, 'm6i.16xlarge': 256, 'm6i.24xlarge': 384,
-        # Compute Optimized
-        'c5.large': 4, 'c5.xlarge': 8, 'c5.2xlarge': 16, 'c5.4xlarge': 32, 'c5.9xlarge': 72, 'c5.12xlarge': 96, 'c5.18xlarge': 144, 'c5.24xlarge': 192,
-        'c5n.large': 5.25, 'c5n.xlarge': 10.5, 'c5n.2xlarge': 21, 'c5n.4xlarge': 42, 'c5n.9xlarge': 96, 'c5n.18xlarge': 192,
-        # Memory Optimized
-        'r4.xlarge': 30.5, 'r4.2xlarge': 61, 'r4.4xlarge': 122, 'r4.8xlarge': 244, 'r4.16xlarge': 488,
-        'r5.large': 16, 'r5.xlarge': 32, 'r5.2xlarge': 64, 'r5.4xlarge': 128, 'r5.8xlarge': 256, 'r5.12xlarge': 384, 'r5.16xlarge': 512, 'r5.24xlarge': 768,
-        'r5a.large': 16, 'r5a.xlarge': 32, 'r5a.2xlarge': 64, 'r5a.4xlarge': 128, 'r5a.8xlarge': 256, 'r5a.12xlarge': 384, 'r5a.16xlarge': 512, 'r5a.24xlarge': 768,
-        'r6i.large': 16, 'r6i.xlarge': 32, 'r6i.2xlarge': 64, 'r6i.4xlarge': 128, 'r6i.8xlarge': 256, 'r6i.12xlarge': 384, 'r6i.16xlarge': 512, 'r6i.24xlarge': 768,
-        'x1.16xlarge': 976, 'x1.32xlarge': 1952, 'x1e.xlarge': 122, 'x1e.2xlarge': 244, 'x1e.4xlarge': 488, 'x1e.8xlarge': 976, 'x1e.16xlarge': 1952, 'x1e.32xlarge': 3904,
-        # Storage Optimized
-        'i3.large': 15.25, 'i3.xlarge': 30.5, 'i3.2xlarge': 61, 'i3.4xlarge': 122, 'i3.8xlarge': 244, 'i3.16xlarge': 488,
-        'd2.xlarge': 30.5, 'd2.2xlarge': 61, 'd2.4xlarge': 122, 'd2.8xlarge': 244,
-        # GPU Instances
-        'p3.2xlarge': 61, 'p3.8xlarge': 244, 'p3.16xlarge': 488,
-        'g4dn.xlarge': 16, 'g4dn.2xlarge': 32, 'g4dn.4xlarge': 64, 'g4dn.8xlarge': 128, 'g4dn.12xlarge': 192, 'g4dn.16xlarge': 256
-    }
-    return memory_map.get(instance_type, 'Unknown')
+from datetime import datetime
+from profiles import load_profiles
+from aws_session import get_client, map_profiles
+from report_utils import write_parquet, write_xlsx
+
+
+# Memory in GiB for common EC2 instance types
+MEMORY_MAP = {
+    # General Purpose
+    't2.nano': 0.5, 't2.micro': 1, 't2.small': 2, 't2.medium': 4, 't2.large': 8, 't2.xlarge': 16, 't2.2xlarge': 32,
+    't3.nano': 0.5, 't3.micro': 1, 't3.small': 2, 't3.medium': 4, 't3.large': 8, 't3.xlarge': 16, 't3.2xlarge': 32,
+    't3a.nano': 0.5, 't3a.micro': 1, 't3a.small': 2, 't3a.medium': 4, 't3a.large': 8, 't3a.xlarge': 16, 't3a.2xlarge': 32,
+    'm3.medium': 3.75, 'm3.large': 7.5, 'm3.xlarge': 15, 'm3.2xlarge': 30,
+    'm5.large': 8, 'm5.xlarge': 16, 'm5.2xlarge': 32, 'm5.4xlarge': 64, 'm5.8xlarge': 128, 'm5.12xlarge': 192, 'm5.16xlarge': 256, 'm5.24xlarge': 384,
+    'm5a.large': 8, 'm5a.xlarge': 16, 'm5a.2xlarge': 32, 'm5a.4xlarge': 64, 'm5a.8xlarge': 128, 'm5a.12xlarge': 192, 'm5a.16xlarge': 256, 'm5a.24xlarge': 384,
+    'm6i.large': 8, 'm6i.xlarge': 16, 'm6i.2xlarge': 32, 'm6i.4xlarge': 64, 'm6i.8xlarge': 128, 'm6i.12xlarge': 192, 'm6i.16xlarge': 256, 'm6i.24xlarge': 384,
+    # Compute Optimized
+    'c5.large': 4, 'c5.xlarge': 8, 'c5.2xlarge': 16, 'c5.4xlarge': 32, 'c5.9xlarge': 72, 'c5.12xlarge': 96, 'c5.18xlarge': 144, 'c5.24xlarge': 192,
+    'c5n.large': 5.25, 'c5n.xlarge': 10.5, 'c5n.2xlarge': 21, 'c5n.4xlarge': 42, 'c5n.9xlarge': 96, 'c5n.18xlarge': 192,
+    # Memory Optimized
+    'r4.xlarge': 30.5, 'r4.2xlarge': 61, 'r4.4xlarge': 122, 'r4.8xlarge': 244, 'r4.16xlarge': 488,
+    'r5.large': 16, 'r5.xlarge': 32, 'r5.2xlarge': 64, 'r5.4xlarge': 128, 'r5.8xlarge': 256, 'r5.12xlarge': 384, 'r5.16xlarge': 512, 'r5.24xlarge': 768,
+    'r5a.large': 16, 'r5a.xlarge': 32, 'r5a.2xlarge': 64, 'r5a.4xlarge': 128, 'r5a.8xlarge': 256, 'r5a.12xlarge': 384, 'r5a.16xlarge': 512, 'r5a.24xlarge': 768,
+    'r6i.large': 16, 'r6i.xlarge': 32, 'r6i.2xlarge': 64, 'r6i.4xlarge': 128, 'r6i.8xlarge': 256, 'r6i.12xlarge': 384, 'r6i.16xlarge': 512, 'r6i.24xlarge': 768,
+    'x1.16xlarge': 976, 'x1.32xlarge': 1952, 'x1e.xlarge': 122, 'x1e.2xlarge': 244, 'x1e.4xlarge': 488, 'x1e.8xlarge': 976, 'x1e.16xlarge': 1952, 'x1e.32xlarge': 3904,
+    # Storage Optimized
+    'i3.large': 15.25, 'i3.xlarge': 30.5, 'i3.2xlarge': 61, 'i3.4xlarge': 122, 'i3.8xlarge': 244, 'i3.16xlarge': 488,
+    'd2.xlarge': 30.5, 'd2.2xlarge': 61, 'd2.4xlarge': 122, 'd2.8xlarge': 244,
+    # GPU Instances
+    'p3.2xlarge': 61, 'p3.8xlarge': 244, 'p3.16xlarge': 488,
+    'g4dn.xlarge': 16, 'g4dn.2xlarge': 32, 'g4dn.4xlarge': 64, 'g4dn.8xlarge': 128, 'g4dn.12xlarge': 192, 'g4dn.16xlarge': 256
+}
+
+# Columns returned by the describe-instances query, in order
+INSTANCE_COLUMNS = [
+    "Name", "InstanceId", "InstanceType", "State", "Application", 
+    "Application Owner", "Role", "Owner", "Environment", "Cost Centre", "Project", "WBS Code",
+    "CoreCount", "ThreadsPerCore", "PrivateIp", "PublicIp", 
+    "VpcId", "SubnetId", "PlatformDetails", "ImageId"
+]
+COLUMNS = INSTANCE_COLUMNS + ["vCPU", "RAM_GB", "VolumeInfo", "TotalVolumeSizeGB", "VolumeTypes"]
+# Nullable integer columns; without these, missing values push them to object dtype
+INSTANCE_DTYPES = {"CoreCount": "Int64", "ThreadsPerCore": "Int64"}
+# Tags reported as their own columns, between State and CoreCount
+INSTANCE_TAG_KEYS = [
+    "Application", "Application Owner", "Role", "Owner", "Environment", "Cost Centre", "Project", "WBS Code"
+]
+# Fields returned by the describe-volumes query
+VOLUME_FIELDS = ["InstanceId", "VolumeId", "Size", "Type", "Device"]
+
+# JMESPath projections applied to the API responses, as the AWS CLI --query options did.
+# Compiled once here instead of being parsed again for every account and page.
+VOLUME_QUERY = jmespath.compile(
+    "Volumes[*].{"
+    "InstanceId:Attachments[0].InstanceId,"
+    "VolumeId:VolumeId,"
+    "Size:Size,"
+    "Type:VolumeType,"
+    "Device:Attachments[0].Device}"
+)
+RESERVATION_QUERY = jmespath.compile(
+    "ReservedInstances[*].{"
+    "ReservationId:ReservedInstancesId,"
+    "InstanceType:InstanceType,"
+    "AvailabilityZone:AvailabilityZone,"
+    "State:State,"
+    "InstanceCount:InstanceCount,"
+    "Start:Start,"
+    "End:End,"
+    "Duration:Duration,"
+    "OfferingType:OfferingType,"
+    "InstancePlatform:ProductDescription,"
+    "Scope:Scope}"
+)
 
 
 # Function to get attached volumes for given instance IDs
 def get_attached_volumes(instance_ids, account_profile):
     if not instance_ids:
-        return {}
-
-    command = [
-        "aws", "ec2", "describe-volumes",
-        "--filters", f"Name=attachment.instance-id,Values={','.join(instance_ids)}",
-        "--query", (
-            "Volumes[*].{"
-            "InstanceId:Attachments[0].InstanceId,"
-            "VolumeId:VolumeId,"
-            "Size:Size,"
-            "Type:VolumeType,"
-            "Device:Attachments[0].Device}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
+        return []
+
+    try:
+        ec2 = get_client(account_profile, 'ec2')
+        pages = ec2.get_paginator('describe_volumes').paginate(
+            Filters=[{'Name': 'attachment.instance-id', 'Values': instance_ids}]
+        )
+        # One record per volume: InstanceId, VolumeId, Size, Type, Device
+        return [volume for page in pages for volume in VOLUME_QUERY.search(page) or []]
+    except Exception as e:
+        print(f"Error retrieving volume data for {account_profile}: {e}")
+        return []
+
+
+def summarise_volumes(volume_records):
+    """Aggregate volume records into per-instance VolumeInfo, TotalVolumeSizeGB and VolumeTypes"""
+    volumes = pd.DataFrame.from_records(volume_records, columns=VOLUME_FIELDS)
+    volumes["Type"] = volumes["Type"].astype(str)
+    volumes["Info"] = (volumes["Device"].astype(str) + ":" + volumes["VolumeId"].astype(str) + ":"
+                       + volumes["Size"].astype(str) + "GiB:" + volumes["Type"])
+    volumes["Size"] = pd.to_numeric(volumes["Size"], errors="coerce")
+
+    by_instance = volumes.groupby("InstanceId")
+    return pd.DataFrame({
+        "VolumeInfo": by_instance["Info"].agg(", ".join),
+        "TotalVolumeSizeGB": by_instance["Size"].sum(),
+        "VolumeTypes": by_instance["Type"].agg(lambda types: ", ".join(sorted(set(types))))
+    })
+
+
+def instance_row(instance):
+    """Project an instance into INSTANCE_COLUMNS order, reading its tags through one dict"""
+    tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+    cpu_options = instance.get('CpuOptions', {})
+    return [
+        tags.get('Name'), instance.get('InstanceId'), instance.get('InstanceType'),
+        instance.get('State', {}).get('Name'),
+        *(tags.get(key) for key in INSTANCE_TAG_KEYS),
+        cpu_options.get('CoreCount'), cpu_options.get('ThreadsPerCore'),
+        instance.get('PrivateIpAddress'), instance.get('PublicIpAddress'), instance.get('VpcId'),
+        instance.get('SubnetId'), instance.get('PlatformDetails'), instance.get('ImageId')
     ]
 
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
-    if result.returncode != 0:
-        print(f"Error retrieving volume data for {account_profile}: {result.stderr}")
-        return {}
+# Function to describe EC2 instances and their attached volumes
+def describe_ec2_instances(account_profile):
+    """Return the account's instance rows (Account first) and their attached volume records"""
+    try:
+        ec2 = get_client(account_profile, 'ec2')
+        pages = ec2.get_paginator('describe_instances').paginate()
+
+        flat_data = [[account_profile] + instance_row(instance)
+                     for page in pages
+                     for reservation in page.get('Reservations', [])
+                     for instance in reservation.get('Instances', [])]
+        instance_ids = [item[2] for item in flat_data if item[2]]
+        volume_records = get_attached_volumes(instance_ids, account_profile)
+
+        print(f"EC2 + volume details for {account_profile} added.")
+        return flat_data, volume_records
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    return [], []
 
-    volume_data = json.loads(result.stdout)
-    volumes_by_instance = {}
-    for vol in volume_data:
-        instance_id = vol["InstanceId"]
-        vol_info = f"{vol['Device']}:{vol['VolumeId']}:{vol['Size']}GiB:{vol['Type']}"
-        volumes_by_instance.setdefault(instance_id, []).append(vol_info)
 
-    return volumes_by_instance
+def build_instance_frame(instance_rows, volume_records):
+    """Build the EC2Instances sheet once from every account's rows"""
+    df = pd.DataFrame.from_records(instance_rows, columns=["Account"] + INSTANCE_COLUMNS).astype(INSTANCE_DTYPES)
 
+    # vCPU and RAM are derived column-wise rather than per instance
+    df["vCPU"] = df["CoreCount"] * df["ThreadsPerCore"]
+    df["RAM_GB"] = df["InstanceType"].map(MEMORY_MAP).fillna('Unknown')
 
-# Function to describe EC2 instances and their attached volumes
-def describe_ec2_instances(account_profile, all_data):
-    command = [
-        "aws", "ec2", "describe-instances",
-        "--query", (
-            "Reservations[*].Instances[*]."
-            "[Tags[?Key=='Name'].Value | [0], "
-            "InstanceId, InstanceType, State.Name, "
-            "Tags[?Key=='Application'].Value | [0], "
-            "Tags[?Key=='Application Owner'].Value | [0], "
-            "Tags[?Key=='Role'].Value | [0], "
-            "Tags[?Key=='Owner'].Value | [0], "
-            "Tags[?Key=='Environment'].Value | [0], "
-            "Tags[?Key=='Cost Centre'].Value | [0], "
-            "Tags[?Key=='Project'].Value | [0], "
-            "Tags[?Key=='WBS Code'].Value | [0], "
-            "CpuOptions.CoreCount, CpuOptions.ThreadsPerCore, "
-            "PrivateIpAddress, PublicIpAddress, VpcId, SubnetId, PlatformDetails, ImageId]"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
+    # Attach the per-instance volume aggregates; instances without volumes get blanks
+    volume_summary = summarise_volumes(volume_records)
+    df["VolumeInfo"] = df["InstanceId"].map(volume_summary["VolumeInfo"]).fillna("")
+    df["TotalVolumeSizeGB"] = df["InstanceId"].map(volume_summary["TotalVolumeSizeGB"]).fillna(0).astype("Int64")
+    df["VolumeTypes"] = df["InstanceId"].map(volume_summary["VolumeTypes"]).fillna("")
+    return df[["Account"] + COLUMNS]
 
-    try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            flat_data = [item for sublist in data for item in sublist]
-
-            instance_ids = [item[1] for item in flat_data if item[1]]
-            volumes_by_instance = get_attached_volumes(instance_ids, account_profile)
-
-
-            
-            for item in flat_data:
-                core_count = item[12]  # Updated index for CoreCount
-                threads_per_core = item[13]  # Updated index for ThreadsPerCore
-                vcpu = core_count * threads_per_core if core_count and threads_per_core else None
-                item.append(vcpu)
-                
-                # Add RAM information
-                instance_type = item[2]
-                ram_gb = get_instance_memory(instance_type)
-                item.append(ram_gb)
-                
-
-
-                # Process volume information
-                instance_id = item[1]  # Get instance ID from the current item
-                volume_info = volumes_by_instance.get(instance_id, [])
-                item.append(", ".join(volume_info))
-
-                total_gb = 0
-                for vol in volume_info:
-                    try:
-                        size_str = vol.split(":")[2].replace("GiB", "")
-                        total_gb += int(size_str)
-                    except (IndexError, ValueError):
-                        pass
-                item.append(total_gb)
-
-                volume_types = set()
-                for vol in volume_info:
-                    try:
-                        volume_type = vol.split(":")[3]
-                        volume_types.add(volume_type)
-                    except IndexError:
-                        pass
-                item.append(", ".join(sorted(volume_types)))
-
-            columns = [
-                "Name", "InstanceId", "InstanceType", "State", "Application", 
-                "Application Owner", "Role", "Owner", "Environment", "Cost Centre", "Project", "WBS Code",
-                "CoreCount", "ThreadsPerCore", "PrivateIp", "PublicIp", 
-                "VpcId", "SubnetId", "PlatformDetails", "ImageId", "vCPU", "RAM_GB",
-                "VolumeInfo", "TotalVolumeSizeGB", "VolumeTypes"
-            ]
-
-            df = pd.DataFrame(flat_data, columns=columns)
-            df["Account"] = account_profile
-            df = df[["Account"] + columns]
-
-            all_data.append(df)
-            print(f"EC2 + volume details for {account_profile} added.")
-        else:
-            print(f"Error running AWS CLI command for {account_profile}: {result.stderr}")
-    except Exception as e:
-        print(f"An error occurred: {e}")
 
 # Function to get EC2 reservations
-def get_ec2_reservations(account_profile, reservation_data):
-    command = [
-        "aws", "ec2", "describe-reserved-instances",
-        "--query", (
-            "ReservedInstances[*].{"
-            "ReservationId:ReservedInstancesId,"
-            "InstanceType:InstanceType,"
-            "AvailabilityZone:AvailabilityZone,"
-            "State:State,"
-            "InstanceCount:InstanceCount,"
-            "Start:Start,"
-            "End:End,"
-            "Duration:Duration,"
-            "OfferingType:OfferingType,"
-            "InstancePlatform:ProductDescription,"
-            "Scope:Scope}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
+def get_ec2_reservations(account_profile):
+    """Return the account's reserved instance records"""
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            df = pd.DataFrame(data)
-            df["Account"] = account_profile
-            reservation_data.append(df)
-            print(f"Reservation data for {account_profile} added.")
-        else:
-            print(f"Error retrieving reservation data for {account_profile}: {result.stderr}")
+        ec2 = get_client(account_profile, 'ec2')
+        records = RESERVATION_QUERY.search(ec2.describe_reserved_instances()) or []
+        for record in records:
+            # Render Start/End the way the AWS CLI printed them
+            for field in ("Start", "End"):
+                if isinstance(record.get(field), datetime):
+                    record[field] = record[field].isoformat()
+            record["Account"] = account_profile
+        print(f"Reservation data for {account_profile} added.")
+        return records
     except Exception as e:
         print(f"An error occurred retrieving reservations: {e}")
+    return []
 
 
 if __name__ == "__main__":
-    all_data = []
-    reservation_data = []
+    parser = argparse.ArgumentParser(description="EC2 instance and reservation inventory across AWS accounts")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Write zstd-compressed Parquet files instead of Excel (requires pyarrow)")
+    args = parser.parse_args()
 
     # Load AWS profiles from external file
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            aws_profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json not found, using default profiles")
-        aws_profiles = ["shared"]
+    aws_profiles = load_profiles()
 
-    for profile in aws_profiles:
-        describe_ec2_instances(account_profile=profile, all_data=all_data)
-        get_ec2_reservations(account_profile=profile, reservation_data=reservation_data)
+    # Accounts are fetched concurrently on threads; records are collected and framed once
+    all_data, volume_data, reservation_data = [], [], []
+    for instance_rows, volume_records in map_profiles(describe_ec2_instances, aws_profiles):
+        all_data.extend(instance_rows)
+        volume_data.extend(volume_records)
+    for records in map_profiles(get_ec2_reservations, aws_profiles):
+        reservation_data.extend(records)
 
     if all_data or reservation_data:
-        from datetime import datetime
-
         timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
-        filename = f"ec2_instance_and_reservations_{timestamp}.xlsx"
-
-        with pd.ExcelWriter(filename) as writer:
-            if all_data:
-                final_df = pd.concat(all_data, ignore_index=True)
-                final_df.to_excel(writer, index=False, sheet_name="EC2Instances")
-            if reservation_data:
-                reservations_df = pd.concat(reservation_data, ignore_index=True)
-                reservations_df.to_excel(writer, index=False, sheet_name="Reservations")
-
-        print("All EC2 and reservation details saved to Excel.")
+        sheets = {}
+        if all_data:
+            sheets["EC2Instances"] = build_instance_frame(all_data, volume_data)
+        if reservation_data:
+            sheets["Reservations"] = pd.DataFrame.from_records(reservation_data)
+
+        if args.parquet:
+            for sheet_name, df in sheets.items():
+                write_parquet(f"ec2_{sheet_name.lower()}_{timestamp}.parquet", df)
+            print("All EC2 and reservation details saved to Parquet.")
+        else:
+            write_xlsx(f"ec2_instance_and_reservations_{timestamp}.xlsx", sheets)
+            print("All EC2 and reservation details saved to Excel.")
     else:
         print("No data collected from any profiles.")
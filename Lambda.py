@@ -1,167 +1,217 @@
-import subprocess
-import json
+import argparse
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import partial
+from profiles import load_profiles
+from aws_session import get_client, map_profiles
+from report_utils import write_parquet, write_xlsx
+
+# list_functions fields copied as-is; EnvironmentVariables is read from Environment.Variables
+RAW_COLUMNS = [
+    "FunctionName", "FunctionArn", "Runtime", "Role", "Handler", "CodeSize", "MemorySize", "Timeout", "LastModified", "Tags"
+]
+
+# Final column order with LastInvocationTime right after LastModified
+FINAL_COLUMNS = [
+    "Account", "FunctionName", "FunctionArn", "Runtime", "Role", "Handler", "CodeSize", "MemorySize", "Timeout", 
+    "LastModified", "LastInvocationTime", "EnvironmentVariables", "Tags"
+]
+
+# Log stream lookups are network-bound, so overlap them on a thread pool
+MAX_WORKERS = 32
+# get_metric_data accepts up to 500 queries per request
+METRIC_QUERIES_PER_CALL = 500
+# Daily CloudWatch datapoints are retained for 455 days
+METRIC_LOOKBACK_DAYS = 455
+
+# Function to get last invocation days for many functions from CloudWatch metrics
+def get_last_invocations_from_metrics(function_names, cloudwatch):
+    """Return {function_name: epoch ms} for functions with Invocations in the metric window.
+
+    Resolution is one day (the start of the most recent day with invocations).
+    """
+    end_time = datetime.now(timezone.utc)
+    start_time = end_time - timedelta(days=METRIC_LOOKBACK_DAYS)
+    paginator = cloudwatch.get_paginator("get_metric_data")
+    last_invocations = {}
+
+    for offset in range(0, len(function_names), METRIC_QUERIES_PER_CALL):
+        batch = function_names[offset:offset + METRIC_QUERIES_PER_CALL]
+        queries = [{
+            "Id": f"q{index}",
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": "AWS/Lambda",
+                    "MetricName": "Invocations",
+                    "Dimensions": [{"Name": "FunctionName", "Value": function_name}]
+                },
+                "Period": 86400,
+                "Stat": "Sum"
+            }
+        } for index, function_name in enumerate(batch)]
+
+        for page in paginator.paginate(MetricDataQueries=queries, StartTime=start_time,
+                                       EndTime=end_time, ScanBy="TimestampDescending"):
+            for result in page.get("MetricDataResults", []):
+                active = [ts for ts, value in zip(result.get("Timestamps", []), result.get("Values", [])) if value > 0]
+                if active:
+                    function_name = batch[int(result["Id"][1:])]
+                    millis = int(max(active).timestamp() * 1000)
+                    last_invocations[function_name] = max(millis, last_invocations.get(function_name, 0))
+
+    return last_invocations
 
 # Function to get the last invocation time of a Lambda function
-def get_last_invocation_time(function_name, account_profile):
+def get_last_invocation_time(function_name, logs):
     print(f"  - Checking last invocation for {function_name}...")
-    # Get the current time in UTC using timezone-aware approach
-    end_time = datetime.now(timezone.utc)
-    # Look back 30 days
-    start_time = end_time - timedelta(days=30)
-    
-    # Format times for CloudWatch Logs query
-    start_time_str = start_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-    end_time_str = end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-    
-    # Command to get the latest log stream
-    command = [
-        "aws", "logs", "describe-log-streams",
-        "--log-group-name", f"/aws/lambda/{function_name}",
-        "--order-by", "LastEventTime",
-        "--descending",
-        "--limit", "1",
-        "--query", "logStreams[0].lastEventTimestamp",
-        "--output", "text",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-    
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        streams = logs.describe_log_streams(
+            logGroupName=f"/aws/lambda/{function_name}",
+            orderBy="LastEventTime",
+            descending=True,
+            limit=1
+        ).get("logStreams", [])
         
-        if result.returncode == 0 and result.stdout.strip():
-            # Convert timestamp (milliseconds since epoch) to readable date
-            timestamp = int(result.stdout.strip()) / 1000  # Convert to seconds
-            last_invocation = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
-            print(f"    ✓ Found last invocation: {last_invocation}")
-            return last_invocation
+        if streams and streams[0].get("lastEventTimestamp"):
+            # Milliseconds since epoch; converted for the whole column at once in invocation_times()
+            print(f"    ✓ Found last invocation")
+            return streams[0]["lastEventTimestamp"]
         else:
             print(f"    ✗ No recent invocations found")
             return "No recent invocations"
+    except logs.exceptions.ResourceNotFoundException:
+        print(f"    ✗ No recent invocations found")
+        return "No recent invocations"
     except Exception as e:
         print(f"    ✗ Error retrieving logs: {str(e)[:100]}")
         return "Error retrieving logs"
 
-def describe_lambda_functions(account_profile, all_data):
+def function_record(function, account_profile):
+    """Project a list_functions entry into report fields (Tags is not part of list_functions)"""
+    record = {column: function.get(column) for column in RAW_COLUMNS}
+    record["EnvironmentVariables"] = function.get("Environment", {}).get("Variables")
+    record["Account"] = account_profile
+    return record
+
+def describe_lambda_functions(account_profile):
     print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Processing account: {account_profile}")
     print(f"Retrieving Lambda functions list...")
-    command = [
-        "aws", "lambda", "list-functions", "--no-verify-ssl",
-        "--query", "Functions[*].[FunctionName, FunctionArn, Runtime, Role, Handler, CodeSize, MemorySize, Timeout, LastModified, Environment.Variables, Tags]",
-        "--output", "json",
-        "--profile", account_profile
-    ]
     
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        pages = get_client(account_profile, "lambda").get_paginator("list_functions").paginate()
+        # One record per function; the DataFrame is built once across all accounts
+        records = [function_record(function, account_profile)
+                   for page in pages for function in page.get("Functions", [])]
+        function_count = len(records)
+        print(f"Found {function_count} Lambda functions in {account_profile}")
         
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            function_count = len(data)
-            print(f"Found {function_count} Lambda functions in {account_profile}")
-            
-            # Define column headers for the raw data
-            raw_columns = [
-                "FunctionName", "FunctionArn", "Runtime", "Role", "Handler", "CodeSize", "MemorySize", "Timeout", "LastModified", "EnvironmentVariables", "Tags"
-            ]
-
-            # Convert data to DataFrame
-            df = pd.DataFrame(data, columns=raw_columns)
-            
-            # Add "Account" column to differentiate the data
-            df["Account"] = account_profile
-            
-            # Get last invocation time for each function
-            print(f"Retrieving last invocation times for {function_count} functions...")
-            df["LastInvocationTime"] = df["FunctionName"].apply(lambda x: get_last_invocation_time(x, account_profile))
-            
-            # Define the final column order with LastInvocationTime right after LastModified
-            final_columns = [
-                "Account", "FunctionName", "FunctionArn", "Runtime", "Role", "Handler", "CodeSize", "MemorySize", "Timeout", 
-                "LastModified", "LastInvocationTime", "EnvironmentVariables", "Tags"
-            ]
-            
-            # Reorder columns according to the final order
-            df = df[final_columns]
-            
-            # Append this data to the all_data list
-            all_data.append(df)
-            print(f"✓ Lambda function details for {account_profile} added to the data.")
-        else:
-            print(f"Error running AWS CLI command for {account_profile}: {result.stderr}")
+        # Get last invocation time for each function
+        print(f"Retrieving last invocation times for {function_count} functions...")
+        function_names = [record["FunctionName"] for record in records]
+        # One batched metrics query covers every function invoked within the metric window
+        try:
+            from_metrics = get_last_invocations_from_metrics(
+                function_names, get_client(account_profile, "cloudwatch"))
+        except Exception as e:
+            print(f"  Could not read invocation metrics, falling back to logs: {str(e)[:100]}")
+            from_metrics = {}
+        
+        # Only functions without recent metrics need a per-function log stream lookup
+        idle_functions = [name for name in function_names if name not in from_metrics]
+        logs = get_client(account_profile, "logs")
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            from_logs = dict(zip(idle_functions, executor.map(
+                partial(get_last_invocation_time, logs=logs), idle_functions)))
+        for record in records:
+            name = record["FunctionName"]
+            record["LastInvocationTime"] = from_metrics.get(name) or from_logs[name]
+        
+        print(f"✓ Lambda function details for {account_profile} added to the data.")
+        return records
     except Exception as e:
-        print(f"An error occurred: {e}")
+        print(f"An error occurred for {account_profile}: {e}")
+    return []
+
+# Placeholder values recorded when no invocation data is available
+NO_DATE_VALUES = ["", "No recent invocations", "Error retrieving logs"]
+
+def invocation_times(values):
+    """Convert epoch-millisecond invocation times to UTC timestamps, keeping placeholder strings"""
+    millis = pd.to_numeric(values, errors='coerce')
+    # Excel has no time zones, so the timestamps are written as naive UTC
+    return pd.to_datetime(millis, unit='ms').astype(object).where(millis.notna(), values)
+
+def is_older_than(dates, cutoff):
+    """Vectorized check that date strings are older than cutoff; missing dates count as old"""
+    missing = dates.isna() | dates.isin(NO_DATE_VALUES)
+    # Unparseable dates become NaT and compare False, i.e. not old
+    parsed = pd.to_datetime(dates.mask(missing), errors='coerce', utc=True)
+    return missing | (parsed < cutoff)
 
 if __name__ == "__main__":
-    # List to store all data
-    all_data = []
+    parser = argparse.ArgumentParser(description="Lambda function inventory across AWS accounts")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Write zstd-compressed Parquet files instead of Excel (requires pyarrow)")
+    args = parser.parse_args()
     
-    # List of AWS profiles to iterate over
-    aws_profiles = [
-        "int", "shared", "dnaDev", "dnaProd", "poc", "sec", "lionDC", "sapDev", "sapProd", "hpMonitoring", "contactCentre", "contactCentreProd", "master", "genAI", "audit"
-    ]
+    # Load AWS profiles from external file
+    aws_profiles = load_profiles()
     
     print(f"\n{'='*60}")
     print(f"LAMBDA FUNCTION INVENTORY SCRIPT - STARTED AT {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}")
     print(f"Will process {len(aws_profiles)} AWS accounts")
     
-    # Run for all accounts and collect the data
-    for i, profile in enumerate(aws_profiles, 1):
-        print(f"\nProcessing account {i}/{len(aws_profiles)}: {profile}")
-        describe_lambda_functions(account_profile=profile, all_data=all_data)
+    # Run for all accounts concurrently on threads and collect the data
+    all_data = []
+    for records in map_profiles(describe_lambda_functions, aws_profiles):
+        all_data.extend(records)
     
-    # Concatenate all data into a single DataFrame
-    final_df = pd.concat(all_data, ignore_index=True)
+    # Build a single DataFrame from every account's records
+    final_df = pd.DataFrame.from_records(all_data, columns=FINAL_COLUMNS)
+    final_df["LastInvocationTime"] = invocation_times(final_df["LastInvocationTime"])
     
     # Create a DataFrame for inactive functions (not modified or invoked for over 2 years)
     print(f"\n{'='*60}")
     print(f"Identifying inactive Lambda functions (not modified or invoked for over 2 years)...")
     
-    # Calculate the date 2 years ago from today
-    two_years_ago = (datetime.now() - timedelta(days=730)).strftime("%Y-%m-%d")
-    
-    # Function to check if a date string is older than 2 years
-    def is_older_than_two_years(date_str):
-        if not date_str or date_str in ["No recent invocations", "Error retrieving logs"]:
-            return True  # Consider as old if no invocation data
-        try:
-            # Handle different date formats
-            if 'T' in date_str:
-                # ISO format like '2021-11-15T14:30:00.000+0000'
-                date_part = date_str.split('T')[0]
-            else:
-                # Format like '2021-11-15 14:30:00'
-                date_part = date_str.split(' ')[0]
-            return date_part < two_years_ago
-        except Exception:
-            return False
+    # Calculate the cutoff 2 years ago from today
+    two_years_ago = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=730)
     
     # Filter functions that haven't been modified or invoked for over 2 years
     inactive_df = final_df[
-        final_df['LastModified'].apply(is_older_than_two_years) & 
-        final_df['LastInvocationTime'].apply(is_older_than_two_years)
+        is_older_than(final_df['LastModified'], two_years_ago) & 
+        is_older_than(final_df['LastInvocationTime'], two_years_ago)
     ].copy()
     
     print(f"Found {len(inactive_df)} Lambda functions that haven't been modified or invoked for over 2 years")
     
-    # Save to a single Excel file with timestamp
-    from datetime import datetime
-    
-    print(f"\n{'='*60}")
-    print(f"Saving results to Excel file...")
     timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
-    filename = f"lambda_function_details_{timestamp}.xlsx"
-    
-    with pd.ExcelWriter(filename) as writer:
-        final_df.to_excel(writer, sheet_name='All Functions', index=False)
-        inactive_df.to_excel(writer, sheet_name='Inactive Functions (2+ years)', index=False)
+    print(f"\n{'='*60}")
     
-    print(f"✓ All Lambda function details saved to {filename}")
-    print(f"✓ Sheet 1: All Functions ({len(final_df)} records)")
-    print(f"✓ Sheet 2: Inactive Functions ({len(inactive_df)} records)")
+    if args.parquet:
+        print(f"Saving results to Parquet files...")
+        filename = f"lambda_function_details_{timestamp}.parquet"
+        inactive_filename = f"lambda_inactive_functions_{timestamp}.parquet"
+        write_parquet(filename, final_df)
+        write_parquet(inactive_filename, inactive_df)
+        print(f"✓ All Functions ({len(final_df)} records) saved to {filename}")
+        print(f"✓ Inactive Functions ({len(inactive_df)} records) saved to {inactive_filename}")
+    else:
+        # Save to a single Excel file with timestamp
+        print(f"Saving results to Excel file...")
+        filename = f"lambda_function_details_{timestamp}.xlsx"
+        
+        # xlsxwriter streams rows to disk rather than holding the workbook in memory
+        write_xlsx(filename, {
+            'All Functions': final_df,
+            'Inactive Functions (2+ years)': inactive_df
+        })
+        
+        print(f"✓ All Lambda function details saved to {filename}")
+        print(f"✓ Sheet 1: All Functions ({len(final_df)} records)")
+        print(f"✓ Sheet 2: Inactive Functions ({len(inactive_df)} records)")
     print(f"{'='*60}")
     print(f"SCRIPT COMPLETED AT {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}")
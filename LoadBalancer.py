@@ -10,7 +10,7 @@ This script inventories all types of load balancers across multiple AWS accounts
 
 Setup:
 1. Configure AWS profiles in aws_profiles.json
-2. Ensure AWS CLI is configured with proper permissions
+2. Ensure AWS credentials are configured with proper permissions (pip install pandas boto3)
 3. Run script: python LoadBalancer.py
 
 Output:
@@ -18,212 +18,191 @@ Output:
 - Console output showing progress for each account processed
 """
 
-import subprocess
-import json
 import pandas as pd
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from aws_session import get_client, map_profiles
+from profiles import load_profiles
+from report_utils import write_xlsx
+
+# Per-LB detail lookups are network-bound, so overlap them on a thread pool.
+# This also caps concurrent describe_listeners calls per account.
+MAX_WORKERS = 16
+# Load balancer states whose listeners are looked up
+LISTENER_STATES = {'active', 'active_impaired'}
+# ARNs per elbv2 describe_tags request (API maximum)
+TAG_BATCH_SIZE = 20
+
+# Fields kept from elbv2 describe_load_balancers, in report order
+LB_FIELDS = [
+    'LoadBalancerArn', 'DNSName', 'CanonicalHostedZoneId', 'CreatedTime', 'LoadBalancerName',
+    'Scheme', 'VpcId', 'State', 'Type', 'IpAddressType', 'SecurityGroups', 'AvailabilityZones'
+]
+# Fields kept from elb describe_load_balancers (Classic)
+CLB_FIELDS = [
+    'LoadBalancerName', 'DNSName', 'CanonicalHostedZoneNameID', 'CreatedTime', 'Scheme', 'VPCId',
+    'SecurityGroups', 'Subnets', 'AvailabilityZones', 'Instances', 'HealthCheck', 'ListenerDescriptions'
+]
+# Report columns, in order
+LB_COLUMNS = [
+    'Account', 'LoadBalancerName', 'Name', 'Type', 'DNSName', 'Scheme', 'State', 'VpcId',
+    'IpAddressType', 'CreatedTime', 'AvailabilityZones', 'Subnets', 'SecurityGroups',
+    'ListenerPorts', 'ListenerProtocols', 'SSLPolicies', 'Certificates', 'TargetGroups',
+    'TargetGroupCount', 'InstanceCount', 'HealthCheckTarget', 'Tags', 'LoadBalancerArn'
+]
+# Declared up front so pandas doesn't infer types row by row
+LB_DTYPES = {
+    'Account': 'category',
+    'Type': 'category',
+    'Scheme': 'category',
+    'State': 'category',
+    'IpAddressType': 'category',
+    'TargetGroupCount': 'int64',
+    'InstanceCount': 'Int64'
+}
+# One report row; namedtuples carry no per-instance __dict__
+LBRecord = namedtuple('LBRecord', LB_COLUMNS)
+
+TARGET_GROUP_FIELDS = [
+    'TargetGroupName', 'Protocol', 'Port', 'HealthCheckPath', 'HealthCheckProtocol',
+    'HealthyThresholdCount', 'UnhealthyThresholdCount'
+]
+
+def iso_time(value):
+    """Render boto3 datetimes as ISO 8601 strings, the way the AWS CLI printed them."""
+    return value.isoformat() if isinstance(value, datetime) else value
 
 def get_load_balancers(account_profile):
     """Retrieve all load balancers (ALB/NLB) for an account."""
     print(f"Checking ALB/NLB for account: {account_profile}")
 
-    command = [
-        "aws", "elbv2", "describe-load-balancers",
-        "--query", (
-            "LoadBalancers[*].{"
-            "LoadBalancerArn:LoadBalancerArn,"
-            "DNSName:DNSName,"
-            "CanonicalHostedZoneId:CanonicalHostedZoneId,"
-            "CreatedTime:CreatedTime,"
-            "LoadBalancerName:LoadBalancerName,"
-            "Scheme:Scheme,"
-            "VpcId:VpcId,"
-            "State:State.Code,"
-            "Type:Type,"
-            "IpAddressType:IpAddressType,"
-            "SecurityGroups:SecurityGroups,"
-            "AvailabilityZones:AvailabilityZones}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            print(f"  Found {len(data)} ALB/NLB load balancers")
-            return data
-        else:
-            print(f"  Error retrieving ALB/NLB data: {result.stderr}")
-            return []
+        elbv2 = get_client(account_profile, 'elbv2')
+        data = []
+        for page in elbv2.get_paginator('describe_load_balancers').paginate():
+            for lb in page.get('LoadBalancers', []):
+                record = {field: lb.get(field) for field in LB_FIELDS}
+                record['State'] = (lb.get('State') or {}).get('Code')
+                record['CreatedTime'] = iso_time(record['CreatedTime'])
+                data.append(record)
+        print(f"  Found {len(data)} ALB/NLB load balancers")
+        return data
     except Exception as e:
-        print(f"  Error processing ALB/NLB data: {e}")
+        print(f"  Error retrieving ALB/NLB data: {e}")
         return []
 
 def get_classic_load_balancers(account_profile):
     """Retrieve Classic Load Balancers for an account."""
     print(f"Checking CLB for account: {account_profile}")
 
-    command = [
-        "aws", "elb", "describe-load-balancers",
-        "--query", (
-            "LoadBalancerDescriptions[*].{"
-            "LoadBalancerName:LoadBalancerName,"
-            "DNSName:DNSName,"
-            "CanonicalHostedZoneNameID:CanonicalHostedZoneNameID,"
-            "CreatedTime:CreatedTime,"
-            "Scheme:Scheme,"
-            "VPCId:VPCId,"
-            "SecurityGroups:SecurityGroups,"
-            "Subnets:Subnets,"
-            "AvailabilityZones:AvailabilityZones,"
-            "Instances:Instances,"
-            "HealthCheck:HealthCheck,"
-            "ListenerDescriptions:ListenerDescriptions}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            print(f"  Found {len(data)} Classic Load Balancers")
-            return data
-        else:
-            print(f"  Error retrieving CLB data: {result.stderr}")
-            return []
+        elb = get_client(account_profile, 'elb')
+        data = []
+        for page in elb.get_paginator('describe_load_balancers').paginate():
+            for lb in page.get('LoadBalancerDescriptions', []):
+                record = {field: lb.get(field) for field in CLB_FIELDS}
+                record['CreatedTime'] = iso_time(record['CreatedTime'])
+                data.append(record)
+        print(f"  Found {len(data)} Classic Load Balancers")
+        return data
     except Exception as e:
-        print(f"  Error processing CLB data: {e}")
+        print(f"  Error retrieving CLB data: {e}")
         return []
 
 def get_listeners(lb_arn, account_profile):
     """Get listeners for a specific load balancer."""
-    command = [
-        "aws", "elbv2", "describe-listeners",
-        "--load-balancer-arn", lb_arn,
-        "--query", "Listeners[*].{Port:Port,Protocol:Protocol,SslPolicy:SslPolicy,CertificateArn:Certificates[0].CertificateArn}",
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        else:
-            return []
-    except Exception:
+        elbv2 = get_client(account_profile, 'elbv2')
+        return [{
+            'Port': listener.get('Port'),
+            'Protocol': listener.get('Protocol'),
+            'SslPolicy': listener.get('SslPolicy'),
+            'CertificateArn': (listener.get('Certificates') or [{}])[0].get('CertificateArn')
+        } for page in elbv2.get_paginator('describe_listeners').paginate(LoadBalancerArn=lb_arn)
+            for listener in page.get('Listeners', [])]
+    except Exception as e:
+        # Throttling is retried by the client's adaptive retry mode; anything left is reported
+        print(f"  Error retrieving listeners for {lb_arn}: {e}")
         return []
 
-def get_target_groups(lb_arn, account_profile):
-    """Get target groups for a specific load balancer."""
-    command = [
-        "aws", "elbv2", "describe-target-groups",
-        "--load-balancer-arn", lb_arn,
-        "--query", "TargetGroups[*].{TargetGroupName:TargetGroupName,Protocol:Protocol,Port:Port,HealthCheckPath:HealthCheckPath,HealthCheckProtocol:HealthCheckProtocol,HealthyThresholdCount:HealthyThresholdCount,UnhealthyThresholdCount:UnhealthyThresholdCount}",
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
+def get_target_groups(account_profile):
+    """Get every target group in an account, keyed by the load balancer ARNs it serves."""
+    tgs_by_lb = defaultdict(list)
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        else:
-            return []
-    except Exception:
-        return []
-
-def get_lb_tags(lb_arn, account_profile):
-    """Get tags for a specific load balancer."""
-    command = [
-        "aws", "elbv2", "describe-tags",
-        "--resource-arns", lb_arn,
-        "--query", "TagDescriptions[0].Tags[*].{Key:Key,Value:Value}",
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
+        elbv2 = get_client(account_profile, 'elbv2')
+        # One unfiltered listing replaces a describe_target_groups call per load balancer
+        for page in elbv2.get_paginator('describe_target_groups').paginate():
+            for tg in page.get('TargetGroups', []):
+                record = {field: tg.get(field) for field in TARGET_GROUP_FIELDS}
+                for lb_arn in tg.get('LoadBalancerArns', []):
+                    tgs_by_lb[lb_arn].append(record)
+    except Exception as e:
+        print(f"  Error retrieving target groups: {e}")
+    return tgs_by_lb
 
-    try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        else:
-            return []
-    except Exception:
-        return []
+def get_lb_tags(lb_arns, account_profile):
+    """Get tags for many load balancers, keyed by load balancer ARN."""
+    tag_map = {}
+    # DescribeTags accepts up to TAG_BATCH_SIZE ARNs per call; a failed batch doesn't lose the others
+    for start in range(0, len(lb_arns), TAG_BATCH_SIZE):
+        batch = lb_arns[start:start + TAG_BATCH_SIZE]
+        try:
+            elbv2 = get_client(account_profile, 'elbv2')
+            for description in elbv2.describe_tags(ResourceArns=batch).get('TagDescriptions', []):
+                tag_map[description['ResourceArn']] = description.get('Tags', [])
+        except Exception as e:
+            print(f"  Error retrieving tags for load balancers {start + 1}-{start + len(batch)}: {e}")
+    return tag_map
 
 def extract_tags_info(tags):
     """Extract tags information."""
     if not tags:
         return "", ""
     
-    name = ""
-    tags_str = ""
-    
-    for tag in tags:
-        if tag.get('Key') == 'Name':
-            name = tag.get('Value', '')
-        tags_str += f"{tag.get('Key', '')}:{tag.get('Value', '')}; "
+    name = next((tag.get('Value', '') for tag in tags if tag.get('Key') == 'Name'), "")
+    tags_str = '; '.join(f"{tag.get('Key', '')}:{tag.get('Value', '')}" for tag in tags)
     
-    return name, tags_str.rstrip('; ')
+    return name, tags_str
 
-def process_alb_nlb(lb, account_profile):
+def process_alb_nlb(lb, account_profile, tag_map=None, tgs_by_lb=None):
     """Process ALB/NLB load balancer."""
-    # Get additional details
-    listeners = get_listeners(lb.get('LoadBalancerArn', ''), account_profile)
-    target_groups = get_target_groups(lb.get('LoadBalancerArn', ''), account_profile)
-    tags = get_lb_tags(lb.get('LoadBalancerArn', ''), account_profile)
+    arn = lb.get('LoadBalancerArn', '')
+    az_info = lb.get('AvailabilityZones') or []
+
+    # Get additional details; provisioning and failed load balancers have no listeners worth a call
+    listeners = get_listeners(arn, account_profile) if lb.get('State') in LISTENER_STATES else []
+    target_groups = (tgs_by_lb or {}).get(arn, [])
+    tags = (tag_map or {}).get(arn, [])
     
     name, tags_str = extract_tags_info(tags)
     
-    # Extract availability zones
-    az_info = lb.get('AvailabilityZones', [])
-    az_names = [az.get('ZoneName', '') for az in az_info if isinstance(az, dict)]
-    subnets = [az.get('SubnetId', '') for az in az_info if isinstance(az, dict)]
-    
-    # Extract listener info
-    listener_ports = [str(l.get('Port', '')) for l in listeners if l.get('Port')]
-    listener_protocols = [l.get('Protocol', '') for l in listeners if l.get('Protocol')]
-    ssl_policies = [l.get('SslPolicy', '') for l in listeners if l.get('SslPolicy')]
-    certificates = [l.get('CertificateArn', '') for l in listeners if l.get('CertificateArn')]
-    
-    # Extract target group info
-    tg_names = [tg.get('TargetGroupName', '') for tg in target_groups]
-    
-    return {
-        'Account': account_profile,
-        'LoadBalancerName': lb.get('LoadBalancerName'),
-        'Name': name,
-        'Type': lb.get('Type'),
-        'DNSName': lb.get('DNSName'),
-        'Scheme': lb.get('Scheme'),
-        'State': lb.get('State'),
-        'VpcId': lb.get('VpcId'),
-        'IpAddressType': lb.get('IpAddressType'),
-        'CreatedTime': lb.get('CreatedTime'),
-        'AvailabilityZones': ', '.join(az_names),
-        'Subnets': ', '.join(subnets),
-        'SecurityGroups': ', '.join(lb.get('SecurityGroups', []) or []),
-        'ListenerPorts': ', '.join(listener_ports),
-        'ListenerProtocols': ', '.join(set(listener_protocols)),
-        'SSLPolicies': ', '.join(set(ssl_policies)),
-        'Certificates': ', '.join(certificates),
-        'TargetGroups': ', '.join(tg_names),
-        'TargetGroupCount': len(target_groups),
-        'Tags': tags_str,
-        'LoadBalancerArn': lb.get('LoadBalancerArn')
-    }
+    return LBRecord(
+        Account=account_profile,
+        LoadBalancerName=lb.get('LoadBalancerName'),
+        Name=name,
+        Type=lb.get('Type'),
+        DNSName=lb.get('DNSName'),
+        Scheme=lb.get('Scheme'),
+        State=lb.get('State'),
+        VpcId=lb.get('VpcId'),
+        IpAddressType=lb.get('IpAddressType'),
+        CreatedTime=lb.get('CreatedTime'),
+        AvailabilityZones=', '.join(az.get('ZoneName', '') for az in az_info if isinstance(az, dict)),
+        Subnets=', '.join(az.get('SubnetId', '') for az in az_info if isinstance(az, dict)),
+        SecurityGroups=', '.join(lb.get('SecurityGroups', []) or []),
+        ListenerPorts=', '.join(str(l['Port']) for l in listeners if l.get('Port')),
+        ListenerProtocols=', '.join({l['Protocol'] for l in listeners if l.get('Protocol')}),
+        SSLPolicies=', '.join({l['SslPolicy'] for l in listeners if l.get('SslPolicy')}),
+        Certificates=', '.join(l['CertificateArn'] for l in listeners if l.get('CertificateArn')),
+        TargetGroups=', '.join(tg.get('TargetGroupName', '') for tg in target_groups),
+        TargetGroupCount=len(target_groups),
+        InstanceCount=None,  # ALB/NLB route to target groups
+        HealthCheckTarget='',  # Configured per target group
+        Tags=tags_str,
+        LoadBalancerArn=arn
+    )
 
 def process_classic_lb(lb, account_profile):
     """Process Classic Load Balancer."""
@@ -244,64 +223,60 @@ def process_classic_lb(lb, account_profile):
     health_check = lb.get('HealthCheck', {})
     health_check_target = health_check.get('Target', '')
     
-    return {
-        'Account': account_profile,
-        'LoadBalancerName': lb.get('LoadBalancerName'),
-        'Name': lb.get('LoadBalancerName'),  # CLB doesn't have separate name tag
-        'Type': 'classic',
-        'DNSName': lb.get('DNSName'),
-        'Scheme': lb.get('Scheme'),
-        'State': 'active',  # CLB doesn't have state field
-        'VpcId': lb.get('VPCId', ''),
-        'IpAddressType': 'ipv4',  # CLB default
-        'CreatedTime': lb.get('CreatedTime'),
-        'AvailabilityZones': ', '.join(lb.get('AvailabilityZones', [])),
-        'Subnets': ', '.join(lb.get('Subnets', [])),
-        'SecurityGroups': ', '.join(lb.get('SecurityGroups', [])),
-        'ListenerPorts': ', '.join(listener_ports),
-        'ListenerProtocols': ', '.join(set(listener_protocols)),
-        'SSLPolicies': ', '.join(set(ssl_policies)),
-        'Certificates': '',  # Would need separate call for CLB certs
-        'TargetGroups': '',  # CLB uses instances directly
-        'TargetGroupCount': 0,
-        'InstanceCount': len(lb.get('Instances', [])),
-        'HealthCheckTarget': health_check_target,
-        'Tags': '',
-        'LoadBalancerArn': ''
-    }
+    return LBRecord(
+        Account=account_profile,
+        LoadBalancerName=lb.get('LoadBalancerName'),
+        Name=lb.get('LoadBalancerName'),  # CLB doesn't have separate name tag
+        Type='classic',
+        DNSName=lb.get('DNSName'),
+        Scheme=lb.get('Scheme'),
+        State='active',  # CLB doesn't have state field
+        VpcId=lb.get('VPCId', ''),
+        IpAddressType='ipv4',  # CLB default
+        CreatedTime=lb.get('CreatedTime'),
+        AvailabilityZones=', '.join(lb.get('AvailabilityZones', [])),
+        Subnets=', '.join(lb.get('Subnets', [])),
+        SecurityGroups=', '.join(lb.get('SecurityGroups', [])),
+        ListenerPorts=', '.join(listener_ports),
+        ListenerProtocols=', '.join(set(listener_protocols)),
+        SSLPolicies=', '.join(set(ssl_policies)),
+        Certificates='',  # Would need separate call for CLB certs
+        TargetGroups='',  # CLB uses instances directly
+        TargetGroupCount=0,
+        InstanceCount=len(lb.get('Instances', [])),
+        HealthCheckTarget=health_check_target,
+        Tags='',
+        LoadBalancerArn=''
+    )
+
+def collect_account_load_balancers(account_profile):
+    """Retrieve and process every load balancer type for an account."""
+    # ALB/NLB load balancers; only listeners still need a lookup per load balancer
+    load_balancers = get_load_balancers(account_profile)
+    rows = []
+    if load_balancers:
+        # Tags and target groups are fetched for the whole account up front
+        tag_map = get_lb_tags([lb['LoadBalancerArn'] for lb in load_balancers], account_profile)
+        tgs_by_lb = get_target_groups(account_profile)
+        worker = partial(process_alb_nlb, account_profile=account_profile, tag_map=tag_map, tgs_by_lb=tgs_by_lb)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            rows = list(executor.map(worker, load_balancers))
+    # Classic Load Balancers
+    rows.extend(process_classic_lb(lb, account_profile) for lb in get_classic_load_balancers(account_profile))
+    return rows
 
 def main():
     # Load AWS profiles
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json file not found. Please create it with your AWS profiles.")
-        return
-    except json.JSONDecodeError:
-        print("Error reading aws_profiles.json. Please check the file format.")
-        return
+    profiles = load_profiles()
 
     all_data = []
 
     print("Starting Load Balancer inventory across all accounts...")
     print("=" * 60)
 
-    for profile in profiles:
-        print(f"\nProcessing account: {profile}")
-        print("-" * 40)
-        
-        # Get ALB/NLB load balancers
-        alb_nlb_data = get_load_balancers(profile)
-        for lb in alb_nlb_data:
-            processed_lb = process_alb_nlb(lb, profile)
-            all_data.append(processed_lb)
-        
-        # Get Classic Load Balancers
-        clb_data = get_classic_load_balancers(profile)
-        for lb in clb_data:
-            processed_lb = process_classic_lb(lb, profile)
-            all_data.append(processed_lb)
+    # Accounts are fetched concurrently on threads
+    for rows in map_profiles(collect_account_load_balancers, profiles):
+        all_data.extend(rows)
 
     # Create Excel file with timestamp
     timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
@@ -311,8 +286,9 @@ def main():
     print("=" * 60)
 
     if all_data:
-        df = pd.DataFrame(all_data)
-        df.to_excel(filename, index=False)
+        df = pd.DataFrame.from_records(all_data, columns=LB_COLUMNS).astype(LB_DTYPES, copy=False)
+        # Rows are streamed to disk one at a time (openpyxl write_only equivalent)
+        write_xlsx(filename, {"Sheet1": df})
         print(f"Load balancer inventory saved to {filename}")
         print(f"Total load balancers found: {len(all_data)}")
         
@@ -337,7 +313,7 @@ def main():
             print(f"  * {account}: {count}")
     else:
         # Create empty Excel file
-        pd.DataFrame().to_excel(filename, index=False)
+        write_xlsx(filename, {"Sheet1": pd.DataFrame()})
         print("No load balancers found across all accounts")
 
     print(f"\nLoad Balancer inventory completed successfully!")
@@ -7,176 +7,209 @@ It helps identify Route53 usage, domain configurations, and DNS record types.
 
 Setup:
 1. Configure AWS profiles in aws_profiles.json
-2. Ensure AWS CLI is configured with proper permissions
+2. Ensure AWS credentials are configured with proper permissions (pip install pandas boto3)
 3. Run script: python Route53.py
+   Optional: --cache-dir .aws_cache to reuse responses from recent runs (--force to refresh)
+   Optional: --tag Environment=prod (repeatable) to report only hosted zones with matching tags
 
 Output:
 - Excel file with timestamp containing hosted zones and DNS records data
 - Console output showing progress for each account processed
 """
 
-import subprocess
-import json
+import argparse
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import os
+from functools import partial
+from aws_cache import ResponseCache, add_cache_arguments
+from aws_session import get_client, map_profiles
+from profiles import load_profiles
+from report_utils import write_xlsx
 
-def get_hosted_zones(account_profile, zones_data):
-    """Get Route53 hosted zones for an account."""
-    command = [
-        "aws", "route53", "list-hosted-zones",
-        "--query", (
-            "HostedZones[*].{"
-            "Id:Id,"
-            "Name:Name,"
-            "CallerReference:CallerReference,"
-            "ResourceRecordSetCount:ResourceRecordSetCount,"
-            "Comment:Config.Comment,"
-            "PrivateZone:Config.PrivateZone}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
+# Zones whose records are listed at once per account
+MAX_WORKERS = 10
+
+# Route53 is a global service; its tags are served from us-east-1
+ROUTE53_TAG_REGION = 'us-east-1'
 
+# Report column -> HealthCheckConfig key
+HEALTH_CHECK_FIELDS = {
+    'Type': 'Type',
+    'ResourcePath': 'ResourcePath',
+    'FQDN': 'FullyQualifiedDomainName',
+    'IPAddress': 'IPAddress',
+    'Port': 'Port',
+    'RequestInterval': 'RequestInterval',
+    'FailureThreshold': 'FailureThreshold',
+    'MeasureLatency': 'MeasureLatency',
+    'Inverted': 'Inverted',
+    'Disabled': 'Disabled',
+    'HealthThreshold': 'HealthThreshold',
+    'ChildHealthChecks': 'ChildHealthChecks',
+    'EnableSNI': 'EnableSNI',
+    'Regions': 'Regions'
+}
+
+def get_hosted_zones(account_profile):
+    """Get Route53 hosted zones for an account."""
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            
-            if data:
-                for zone in data:
-                    # Clean up the zone ID (remove /hostedzone/ prefix)
-                    zone['Id'] = zone['Id'].replace('/hostedzone/', '')
-                    zone['Account'] = account_profile
-                
-                df = pd.DataFrame(data)
-                zones_data.append(df)
-                print(f"Found {len(data)} hosted zones for {account_profile}")
-            else:
-                print(f"No hosted zones found for {account_profile}")
+        route53 = get_client(account_profile, 'route53')
+        # Always listed live: it is one cheap call, and its record set counts key the record cache
+        data = [{
+            # Clean up the zone ID (remove /hostedzone/ prefix)
+            'Id': zone['Id'].replace('/hostedzone/', ''),
+            'Name': zone.get('Name'),
+            'CallerReference': zone.get('CallerReference'),
+            'ResourceRecordSetCount': zone.get('ResourceRecordSetCount'),
+            'Comment': zone.get('Config', {}).get('Comment'),
+            'PrivateZone': zone.get('Config', {}).get('PrivateZone'),
+            'Account': account_profile
+        } for page in route53.get_paginator('list_hosted_zones').paginate()
+            for zone in page.get('HostedZones', [])]
+
+        if data:
+            print(f"Found {len(data)} hosted zones for {account_profile}")
         else:
-            print(f"Error getting hosted zones for {account_profile}: {result.stderr}")
+            print(f"No hosted zones found for {account_profile}")
+        return data
     except Exception as e:
         print(f"Error processing hosted zones for {account_profile}: {e}")
+        return []
 
-def get_dns_records(account_profile, zone_id, zone_name, records_data):
-    """Get DNS records for a specific hosted zone."""
-    command = [
-        "aws", "route53", "list-resource-record-sets",
-        "--hosted-zone-id", zone_id,
-        "--query", (
-            "ResourceRecordSets[*].{"
-            "Name:Name,"
-            "Type:Type,"
-            "TTL:TTL,"
-            "ResourceRecords:ResourceRecords[*].Value,"
-            "AliasTarget:AliasTarget.DNSName,"
-            "Weight:Weight,"
-            "Region:Region,"
-            "Failover:Failover,"
-            "SetIdentifier:SetIdentifier,"
-            "HealthCheckId:HealthCheckId}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
+def get_tagged_zone_ids(account_profile, tag_filters, cache):
+    """Return the IDs of hosted zones matching the tag filters, filtered server-side."""
+    client = get_client(account_profile, 'resourcegroupstaggingapi', region_name=ROUTE53_TAG_REGION)
+    paginator = client.get_paginator('get_resources')
+    zone_arns = cache.fetch(account_profile, 'tagging.get_resources', lambda: [
+        resource['ResourceARN']
+        for page in paginator.paginate(ResourceTypeFilters=['route53:hostedzone'], TagFilters=tag_filters)
+        for resource in page.get('ResourceTagMappingList', [])
+    ], ResourceTypeFilters=['route53:hostedzone'], TagFilters=tag_filters)
+    # arn:aws:route53:::hostedzone/<zone id>
+    return {arn.rsplit('/', 1)[-1] for arn in zone_arns}
+
+def list_dns_records(route53, account_profile, zone_id, zone_name):
+    """Page through a hosted zone's record sets and flatten them into report rows."""
+    data = []
+    for page in route53.get_paginator('list_resource_record_sets').paginate(HostedZoneId=zone_id):
+        for record_set in page.get('ResourceRecordSets', []):
+            # Convert ResourceRecords list to string
+            values = [rr['Value'] for rr in record_set.get('ResourceRecords', [])]
+            data.append({
+                'Name': record_set.get('Name'),
+                'Type': record_set.get('Type'),
+                'TTL': record_set.get('TTL'),
+                'ResourceRecords': ', '.join(values) if values else None,
+                'AliasTarget': record_set.get('AliasTarget', {}).get('DNSName'),
+                'Weight': record_set.get('Weight'),
+                'Region': record_set.get('Region'),
+                'Failover': record_set.get('Failover'),
+                'SetIdentifier': record_set.get('SetIdentifier'),
+                'HealthCheckId': record_set.get('HealthCheckId'),
+                'Account': account_profile,
+                'ZoneId': zone_id,
+                'ZoneName': zone_name
+            })
+    return data
 
+def get_dns_records(account_profile, zone_id, zone_name, cache, record_set_count=None):
+    """Get DNS records for a specific hosted zone."""
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            
-            if data:
-                for record in data:
-                    record['Account'] = account_profile
-                    record['ZoneId'] = zone_id
-                    record['ZoneName'] = zone_name
-                    
-                    # Convert ResourceRecords list to string
-                    if record.get('ResourceRecords'):
-                        record['ResourceRecords'] = ', '.join(record['ResourceRecords'])
-                    else:
-                        record['ResourceRecords'] = None
-                
-                df = pd.DataFrame(data)
-                records_data.append(df)
-                print(f"  Found {len(data)} DNS records in zone {zone_name}")
-            else:
-                print(f"  No DNS records found in zone {zone_name}")
+        route53 = get_client(account_profile, 'route53')
+        # The live record set count is part of the key, so a zone whose record count changed is refetched
+        data = cache.fetch(account_profile, 'route53.list_resource_record_sets',
+                           lambda: list_dns_records(route53, account_profile, zone_id, zone_name),
+                           HostedZoneId=zone_id, ResourceRecordSetCount=record_set_count)
+
+        if data:
+            print(f"  Found {len(data)} DNS records in zone {zone_name}")
         else:
-            print(f"  Error getting DNS records for zone {zone_name}: {result.stderr}")
+            print(f"  No DNS records found in zone {zone_name}")
+        return data
     except Exception as e:
         print(f"  Error processing DNS records for zone {zone_name}: {e}")
+        return []
 
-def get_health_checks(account_profile, health_checks_data):
+def get_health_checks(account_profile):
     """Get Route53 health checks for an account."""
-    command = [
-        "aws", "route53", "list-health-checks",
-        "--query", (
-            "HealthChecks[*].{"
-            "Id:Id,"
-            "CallerReference:CallerReference,"
-            "Type:HealthCheckConfig.Type,"
-            "ResourcePath:HealthCheckConfig.ResourcePath,"
-            "FQDN:HealthCheckConfig.FullyQualifiedDomainName,"
-            "IPAddress:HealthCheckConfig.IPAddress,"
-            "Port:HealthCheckConfig.Port,"
-            "RequestInterval:HealthCheckConfig.RequestInterval,"
-            "FailureThreshold:HealthCheckConfig.FailureThreshold,"
-            "MeasureLatency:HealthCheckConfig.MeasureLatency,"
-            "Inverted:HealthCheckConfig.Inverted,"
-            "Disabled:HealthCheckConfig.Disabled,"
-            "HealthThreshold:HealthCheckConfig.HealthThreshold,"
-            "ChildHealthChecks:HealthCheckConfig.ChildHealthChecks,"
-            "EnableSNI:HealthCheckConfig.EnableSNI,"
-            "Regions:HealthCheckConfig.Regions}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            
-            if data:
-                for check in data:
-                    check['Account'] = account_profile
-                    
-                    # Convert lists to strings for Excel compatibility
-                    if check.get('ChildHealthChecks'):
-                        check['ChildHealthChecks'] = ', '.join(check['ChildHealthChecks'])
-                    if check.get('Regions'):
-                        check['Regions'] = ', '.join(check['Regions'])
-                
-                df = pd.DataFrame(data)
-                health_checks_data.append(df)
-                print(f"Found {len(data)} health checks for {account_profile}")
-            else:
-                print(f"No health checks found for {account_profile}")
+        route53 = get_client(account_profile, 'route53')
+        data = []
+        for page in route53.get_paginator('list_health_checks').paginate():
+            for health_check in page.get('HealthChecks', []):
+                config = health_check.get('HealthCheckConfig', {})
+                check = {'Id': health_check.get('Id'), 'CallerReference': health_check.get('CallerReference')}
+                check.update({column: config.get(key) for column, key in HEALTH_CHECK_FIELDS.items()})
+                check['Account'] = account_profile
+
+                # Convert lists to strings for Excel compatibility
+                if check.get('ChildHealthChecks'):
+                    check['ChildHealthChecks'] = ', '.join(check['ChildHealthChecks'])
+                if check.get('Regions'):
+                    check['Regions'] = ', '.join(check['Regions'])
+                data.append(check)
+
+        if data:
+            print(f"Found {len(data)} health checks for {account_profile}")
         else:
-            print(f"Error getting health checks for {account_profile}: {result.stderr}")
+            print(f"No health checks found for {account_profile}")
+        return data
     except Exception as e:
         print(f"Error processing health checks for {account_profile}: {e}")
+        return []
+
+def parse_tag_filters(tags):
+    """Turn --tag KEY or KEY=VALUE arguments into get_resources TagFilters."""
+    filters = {}
+    for tag in tags or []:
+        key, _, value = tag.partition('=')
+        values = filters.setdefault(key, [])
+        if value:
+            values.append(value)
+    return [{'Key': key, 'Values': values} if values else {'Key': key} for key, values in filters.items()]
+
+def collect_account_route53(account_profile, cache=None, tag_filters=None):
+    """Collect hosted zones, DNS records and health checks for one account."""
+    cache = cache or ResponseCache()
+
+    # Get hosted zones
+    zones = get_hosted_zones(account_profile)
+
+    # Keep only zones selected by tag, so record sets are listed just for those
+    if tag_filters and zones:
+        try:
+            zone_ids = get_tagged_zone_ids(account_profile, tag_filters, cache)
+            zones = [zone for zone in zones if zone['Id'] in zone_ids]
+            print(f"{len(zones)} hosted zones match the tag filters for {account_profile}")
+        except Exception as e:
+            print(f"Error retrieving hosted zone tags for {account_profile}: {e}")
+            zones = []
+
+    # Get health checks
+    health_checks = get_health_checks(account_profile)
+
+    # Get DNS records for each hosted zone, several zones at a time
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        records = [record for zone_records in executor.map(
+                       lambda zone: get_dns_records(account_profile, zone['Id'], zone['Name'], cache,
+                                                    zone['ResourceRecordSetCount']), zones)
+                   for record in zone_records]
+
+    # Plain row lists; main() builds one DataFrame per sheet from every account
+    return zones, records, health_checks
 
 def main():
+    parser = argparse.ArgumentParser(description="Route53 inventory across AWS accounts")
+    add_cache_arguments(parser)
+    parser.add_argument("--tag", action="append", metavar="KEY[=VALUE]",
+                        help="Only report hosted zones with this tag (repeatable; all must match)")
+    args = parser.parse_args()
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, force=args.force)
+    tag_filters = parse_tag_filters(args.tag)
+
     # Load AWS profiles
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json file not found. Please create it with your AWS profiles.")
-        return
-    except json.JSONDecodeError:
-        print("Error reading aws_profiles.json. Please check the file format.")
-        return
+    profiles = load_profiles()
 
     zones_data = []
     records_data = []
@@ -185,23 +218,11 @@ def main():
     print("Starting Route53 inventory across all accounts...")
     print("=" * 60)
 
-    for profile in profiles:
-        print(f"\nProcessing account: {profile}")
-        print("-" * 40)
-        
-        # Get hosted zones
-        get_hosted_zones(profile, zones_data)
-        
-        # Get health checks
-        get_health_checks(profile, health_checks_data)
-        
-        # Get DNS records for each hosted zone
-        if zones_data:
-            # Get the zones for this profile from the last added dataframe
-            current_zones_df = zones_data[-1] if zones_data else pd.DataFrame()
-            if not current_zones_df.empty and current_zones_df['Account'].iloc[0] == profile:
-                for _, zone in current_zones_df.iterrows():
-                    get_dns_records(profile, zone['Id'], zone['Name'], records_data)
+    # Accounts are fetched concurrently on threads
+    for zones, records, health_checks in map_profiles(partial(collect_account_route53, cache=cache, tag_filters=tag_filters), profiles):
+        zones_data.extend(zones)
+        records_data.extend(records)
+        health_checks_data.extend(health_checks)
 
     # Create Excel file with timestamp
     timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
@@ -210,41 +231,43 @@ def main():
     print(f"\nCreating Excel file: {filename}")
     print("=" * 60)
 
-    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-        # Hosted Zones sheet
-        if zones_data:
-            all_zones = pd.concat(zones_data, ignore_index=True)
-            all_zones.to_excel(writer, sheet_name='Hosted_Zones', index=False)
-            print(f"Hosted Zones: {len(all_zones)} zones across all accounts")
-        else:
-            pd.DataFrame().to_excel(writer, sheet_name='Hosted_Zones', index=False)
-            print("Hosted Zones: No zones found")
-
-        # DNS Records sheet
-        if records_data:
-            all_records = pd.concat(records_data, ignore_index=True)
-            all_records.to_excel(writer, sheet_name='DNS_Records', index=False)
-            print(f"DNS Records: {len(all_records)} records across all accounts")
-        else:
-            pd.DataFrame().to_excel(writer, sheet_name='DNS_Records', index=False)
-            print("DNS Records: No records found")
-
-        # Health Checks sheet
-        if health_checks_data:
-            all_health_checks = pd.concat(health_checks_data, ignore_index=True)
-            all_health_checks.to_excel(writer, sheet_name='Health_Checks', index=False)
-            print(f"Health Checks: {len(all_health_checks)} health checks across all accounts")
-        else:
-            pd.DataFrame().to_excel(writer, sheet_name='Health_Checks', index=False)
-            print("Health Checks: No health checks found")
+    # Each sheet's frame is built once and reused for the summary
+    all_zones = pd.DataFrame(zones_data)
+    all_records = pd.DataFrame(records_data)
+    all_health_checks = pd.DataFrame(health_checks_data)
+
+    # Hosted Zones sheet
+    if zones_data:
+        print(f"Hosted Zones: {len(all_zones)} zones across all accounts")
+    else:
+        print("Hosted Zones: No zones found")
+
+    # DNS Records sheet
+    if records_data:
+        print(f"DNS Records: {len(all_records)} records across all accounts")
+    else:
+        print("DNS Records: No records found")
+
+    # Health Checks sheet
+    if health_checks_data:
+        print(f"Health Checks: {len(all_health_checks)} health checks across all accounts")
+    else:
+        print("Health Checks: No health checks found")
+
+    # Rows are streamed to disk one at a time (openpyxl write_only equivalent)
+    write_xlsx(filename, {
+        'Hosted_Zones': all_zones,
+        'DNS_Records': all_records,
+        'Health_Checks': all_health_checks
+    })
 
     print(f"\nRoute53 inventory completed successfully!")
     print(f"Results saved to: {filename}")
     
     # Summary statistics
-    total_zones = len(pd.concat(zones_data, ignore_index=True)) if zones_data else 0
-    total_records = len(pd.concat(records_data, ignore_index=True)) if records_data else 0
-    total_health_checks = len(pd.concat(health_checks_data, ignore_index=True)) if health_checks_data else 0
+    total_zones = len(all_zones)
+    total_records = len(all_records)
+    total_health_checks = len(all_health_checks)
     
     print(f"\nSummary:")
     print(f"- Total Hosted Zones: {total_zones}")
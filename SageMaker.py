@@ -9,13 +9,13 @@ Features:
 - Exports data to Excel with timestamped filename
 
 Requirements:
-- AWS CLI configured with profiles for each account
-- Python packages: pandas, subprocess, json
+- AWS credentials configured with profiles for each account
+- Python packages: pandas, boto3, xlsxwriter
 - Proper IAM permissions for SageMaker describe operations
 
 How to run:
 1. Ensure virtual environment is activated: .venv\Scripts\activate
-2. Install dependencies: pip install pandas
+2. Install dependencies: pip install pandas boto3 xlsxwriter
 3. Configure AWS profiles in aws_profiles.json
 4. Run script: python SageMaker.py
 
@@ -24,169 +24,101 @@ Output:
 - Console output showing progress for each account processed
 """
 
-import subprocess
-import json
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from aws_session import get_client, map_profiles
+from profiles import load_profiles
+from report_utils import write_xlsx
 
 
-def get_sagemaker_notebooks(account_profile):
-    """Get SageMaker notebook instances"""
-    command = [
-        "aws", "sagemaker", "list-notebook-instances",
-        "--query", (
-            "NotebookInstances[*].{"
-            "NotebookInstanceName:NotebookInstanceName,"
-            "NotebookInstanceStatus:NotebookInstanceStatus,"
-            "InstanceType:InstanceType,"
-            "CreationTime:CreationTime,"
-            "LastModifiedTime:LastModifiedTime,"
-            "Url:Url}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
+def iso_time(value):
+    """Render boto3 datetimes as ISO 8601 strings, the way the AWS CLI printed them"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
 
+def list_sagemaker_resources(account_profile, operation, result_key, fields):
+    """Page through a SageMaker list operation, keeping only the report fields"""
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        return []
+        sagemaker = get_client(account_profile, 'sagemaker')
+        return [{field: iso_time(item.get(field)) for field in fields}
+                for page in sagemaker.get_paginator(operation).paginate()
+                for item in page.get(result_key, [])]
     except Exception:
         return []
 
 
+def get_sagemaker_notebooks(account_profile):
+    """Get SageMaker notebook instances"""
+    return list_sagemaker_resources(account_profile, 'list_notebook_instances', 'NotebookInstances', [
+        'NotebookInstanceName', 'NotebookInstanceStatus', 'InstanceType', 'CreationTime', 'LastModifiedTime', 'Url'
+    ])
+
+
 def get_sagemaker_endpoints(account_profile):
     """Get SageMaker endpoints"""
-    command = [
-        "aws", "sagemaker", "list-endpoints",
-        "--query", (
-            "Endpoints[*].{"
-            "EndpointName:EndpointName,"
-            "EndpointStatus:EndpointStatus,"
-            "CreationTime:CreationTime,"
-            "LastModifiedTime:LastModifiedTime}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
-    try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        return []
-    except Exception:
-        return []
+    return list_sagemaker_resources(account_profile, 'list_endpoints', 'Endpoints', [
+        'EndpointName', 'EndpointStatus', 'CreationTime', 'LastModifiedTime'
+    ])
 
 
 def get_sagemaker_models(account_profile):
     """Get SageMaker models"""
-    command = [
-        "aws", "sagemaker", "list-models",
-        "--query", (
-            "Models[*].{"
-            "ModelName:ModelName,"
-            "CreationTime:CreationTime}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
-
-    try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        return []
-    except Exception:
-        return []
+    return list_sagemaker_resources(account_profile, 'list_models', 'Models', [
+        'ModelName', 'CreationTime'
+    ])
 
 
 def get_sagemaker_training_jobs(account_profile):
     """Get SageMaker training jobs"""
-    command = [
-        "aws", "sagemaker", "list-training-jobs",
-        "--query", (
-            "TrainingJobSummaries[*].{"
-            "TrainingJobName:TrainingJobName,"
-            "TrainingJobStatus:TrainingJobStatus,"
-            "CreationTime:CreationTime,"
-            "TrainingEndTime:TrainingEndTime}"
-        ),
-        "--output", "json",
-        "--profile", account_profile,
-        "--no-verify-ssl"
-    ]
+    return list_sagemaker_resources(account_profile, 'list_training_jobs', 'TrainingJobSummaries', [
+        'TrainingJobName', 'TrainingJobStatus', 'CreationTime', 'TrainingEndTime'
+    ])
 
-    try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        return []
-    except Exception:
-        return []
 
+def collect_sagemaker_data(account_profile):
+    """Collect all SageMaker data for an account as a list of DataFrames"""
+    all_data = []
 
-def collect_sagemaker_data(account_profile, all_data):
-    """Collect all SageMaker data for an account"""
-    notebooks = get_sagemaker_notebooks(account_profile)
-    endpoints = get_sagemaker_endpoints(account_profile)
-    models = get_sagemaker_models(account_profile)
-    training_jobs = get_sagemaker_training_jobs(account_profile)
-
-    # Process notebooks
-    for notebook in notebooks:
-        notebook['ResourceType'] = 'Notebook Instance'
-        notebook['Account'] = account_profile
-        all_data.append(notebook)
-
-    # Process endpoints
-    for endpoint in endpoints:
-        endpoint['ResourceType'] = 'Endpoint'
-        endpoint['Account'] = account_profile
-        all_data.append(endpoint)
-
-    # Process models
-    for model in models:
-        model['ResourceType'] = 'Model'
-        model['Account'] = account_profile
-        all_data.append(model)
-
-    # Process training jobs
-    for job in training_jobs:
-        job['ResourceType'] = 'Training Job'
-        job['Account'] = account_profile
-        all_data.append(job)
+    # The four list calls are independent, so run them concurrently
+    listers = [get_sagemaker_notebooks, get_sagemaker_endpoints, get_sagemaker_models,
+               get_sagemaker_training_jobs]
+    with ThreadPoolExecutor(max_workers=len(listers)) as executor:
+        notebooks, endpoints, models, training_jobs = executor.map(lambda lister: lister(account_profile), listers)
+
+    # One frame per resource type; constant columns are assigned once rather than per row
+    for resource_type, resources in [('Notebook Instance', notebooks), ('Endpoint', endpoints),
+                                     ('Model', models), ('Training Job', training_jobs)]:
+        if resources:
+            df = pd.DataFrame(resources)
+            df['ResourceType'] = resource_type
+            df['Account'] = account_profile
+            all_data.append(df)
 
     total_resources = len(notebooks) + len(endpoints) + len(models) + len(training_jobs)
     print(f"SageMaker resources for {account_profile}: {total_resources} "
           f"(Notebooks: {len(notebooks)}, Endpoints: {len(endpoints)}, "
           f"Models: {len(models)}, Training Jobs: {len(training_jobs)})")
+    return all_data
 
 
 if __name__ == "__main__":
     all_data = []
 
     # Load AWS profiles from external file
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            aws_profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json not found, using default profiles")
-        aws_profiles = ["shared"]
+    aws_profiles = load_profiles()
 
-    for profile in aws_profiles:
-        collect_sagemaker_data(account_profile=profile, all_data=all_data)
+    # Accounts are fetched concurrently on threads
+    for frames in map_profiles(collect_sagemaker_data, aws_profiles):
+        all_data.extend(frames)
 
     if all_data:
         timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
         filename = f"sagemaker_inventory_{timestamp}.xlsx"
 
-        df = pd.DataFrame(all_data)
-        df.to_excel(filename, index=False, sheet_name="SageMaker_Inventory")
+        df = pd.concat(all_data, ignore_index=True)
+        # Rows are streamed to disk one at a time in xlsxwriter constant_memory mode
+        write_xlsx(filename, {"SageMaker_Inventory": df})
 
         print(f"SageMaker inventory saved to {filename}")
         print(f"Total SageMaker resources found: {len(df)}")
@@ -9,13 +9,13 @@ Combines functionality from:
 Generates comprehensive WorkSpaces inventory with usage analysis and cost optimization recommendations.
 
 Requirements:
-- AWS CLI configured with profiles
-- Python packages: pandas, subprocess, json
+- AWS credentials configured with profiles
+- Python packages: pandas, boto3, xlsxwriter
 - Proper IAM permissions for WorkSpaces describe operations
 
 How to run:
 1. Ensure virtual environment is activated: .venv\Scripts\activate
-2. Install dependencies: pip install pandas
+2. Install dependencies: pip install pandas boto3 xlsxwriter
 3. Configure AWS profiles in aws_profiles.json
 4. Run script: python WorkSpaces_Master.py
 
@@ -23,130 +23,127 @@ Output:
 - Excel file with multiple sheets containing workspace details, usage patterns, and optimization recommendations
 """
 
-import subprocess
-import json
+import numpy as np
 import pandas as pd
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from aws_session import get_client, map_profiles
+from profiles import load_profiles
+from report_utils import write_xlsx
+
+# Top-level describe_workspaces fields kept for the report
+WORKSPACE_FIELDS = [
+    'WorkspaceId', 'DirectoryId', 'UserName', 'IpAddress', 'State', 'BundleId', 'SubnetId',
+    'ErrorMessage', 'VolumeEncryptionKey', 'UserVolumeEncryptionEnabled', 'RootVolumeEncryptionEnabled'
+]
+# (days unused above, UsageStatus, Recommendation), checked in order
+USAGE_BUCKETS = [
+    (90, 'Unused (90+ days)', 'Consider termination - long unused'),
+    (30, 'Unused (30+ days)', 'Review with user - may be unused'),
+    (7, 'Low usage (7+ days)', 'Monitor usage patterns')
+]
+# UsageStatus for workspaces with no recorded connection
+NEVER_USED = 'Never used'
+# Statuses reported on the Unused_WorkSpaces sheet
+UNUSED_STATUSES = {NEVER_USED} | {status for _, status, _ in USAGE_BUCKETS if status.startswith('Unused')}
+# RunningMode -> pricing recommendation; other modes are reported as Unknown
+PRICING_MODELS = {
+    'ALWAYS_ON': 'Personal (Monthly fixed cost)',
+    'AUTO_STOP': 'Core/Pool (Pay per hour)'
+}
+# Fields kept from WorkspaceProperties
+WORKSPACE_PROPERTY_FIELDS = [
+    'ComputeTypeName', 'RootVolumeSizeGib', 'UserVolumeSizeGib', 'RunningMode',
+    'RunningModeAutoStopTimeoutInMinutes', 'Protocols'
+]
+
+
+def summarise_usage(workspaces_status):
+    """Build the usage frame from connection status records, bucketing all workspaces at once"""
+    df = pd.DataFrame(workspaces_status).reindex(
+        columns=['WorkspaceId', 'ConnectionState', 'LastKnownUserConnectionTimestamp'])
+    raw = df['LastKnownUserConnectionTimestamp']
+    last_conn = pd.to_datetime(raw, utc=True, errors='coerce')
+    days = (pd.Timestamp.now(tz='UTC') - last_conn).dt.days
+
+    never = raw.isna()
+    parse_error = ~never & last_conn.isna()
+    # First matching condition wins; NaN day counts compare False
+    conditions = [never, parse_error] + [days > threshold for threshold, _, _ in USAGE_BUCKETS]
+
+    return pd.DataFrame({
+        'WorkspaceId': df['WorkspaceId'].fillna('N/A'),
+        'ConnectionState': df['ConnectionState'].fillna('UNKNOWN'),
+        'LastConnection': last_conn.dt.strftime('%Y-%m-%d %H:%M').fillna('Never'),
+        'DaysUnused': days.astype('Int64').astype(object)
+                          .mask(never, 'Never connected').mask(parse_error, 'Parse error'),
+        'UsageStatus': np.select(conditions, [NEVER_USED, 'Unknown'] + [status for _, status, _ in USAGE_BUCKETS],
+                                 default='Active'),
+        'Recommendation': np.select(conditions, ['Consider termination - never connected', 'Manual review needed']
+                                    + [recommendation for _, _, recommendation in USAGE_BUCKETS],
+                                    default='No action needed')
+    })
 
 
 def get_workspaces_details(account_profile, all_data):
     """Get WorkSpaces details including compute types"""
-    command = [
-        "aws", "workspaces", "describe-workspaces",
-        "--query", (
-            "Workspaces[*].{"
-            "WorkspaceId:WorkspaceId,"
-            "DirectoryId:DirectoryId,"
-            "UserName:UserName,"
-            "IpAddress:IpAddress,"
-            "State:State,"
-            "BundleId:BundleId,"
-            "SubnetId:SubnetId,"
-            "ErrorMessage:ErrorMessage,"
-            "VolumeEncryptionKey:VolumeEncryptionKey,"
-            "UserVolumeEncryptionEnabled:UserVolumeEncryptionEnabled,"
-            "RootVolumeEncryptionEnabled:RootVolumeEncryptionEnabled,"
-            "ComputeTypeName:WorkspaceProperties.ComputeTypeName,"
-            "RootVolumeSizeGib:WorkspaceProperties.RootVolumeSizeGib,"
-            "UserVolumeSizeGib:WorkspaceProperties.UserVolumeSizeGib,"
-            "RunningMode:WorkspaceProperties.RunningMode,"
-            "RunningModeAutoStopTimeoutInMinutes:WorkspaceProperties.RunningModeAutoStopTimeoutInMinutes,"
-            "Protocols:WorkspaceProperties.Protocols}"
-        ),
-        "--output", "json",
-        "--profile", account_profile
-    ]
-
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            if data:
-                df = pd.DataFrame(data)
-                df["Account"] = account_profile
-                all_data.append(df)
-                print(f"WorkSpaces details for {account_profile}: {len(data)} workspaces")
-            else:
-                print(f"No WorkSpaces found for {account_profile}")
+        workspaces = get_client(account_profile, 'workspaces')
+        data = []
+        for page in workspaces.get_paginator('describe_workspaces').paginate():
+            for ws in page.get('Workspaces', []):
+                record = {field: ws.get(field) for field in WORKSPACE_FIELDS}
+                properties = ws.get('WorkspaceProperties', {})
+                record.update({field: properties.get(field) for field in WORKSPACE_PROPERTY_FIELDS})
+                data.append(record)
+
+        if data:
+            df = pd.DataFrame(data)
+            df["Account"] = account_profile
+            all_data.append(df)
+            print(f"WorkSpaces details for {account_profile}: {len(data)} workspaces")
         else:
-            print(f"Error retrieving WorkSpaces for {account_profile}: {result.stderr}")
+            print(f"No WorkSpaces found for {account_profile}")
     except Exception as e:
         print(f"Error for {account_profile}: {e}")
 
 
 def get_workspaces_usage(account_profile, usage_data):
     """Get WorkSpaces connection status and usage patterns"""
-    command = [
-        "aws", "workspaces", "describe-workspaces-connection-status",
-        "--output", "json",
-        "--profile", account_profile
-    ]
-
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            workspaces_status = data.get('WorkspacesConnectionStatus', [])
+        workspaces = get_client(account_profile, 'workspaces')
+        # describe_workspaces_connection_status has no paginator, so follow NextToken directly
+        workspaces_status = []
+        kwargs = {}
+        while True:
+            response = workspaces.describe_workspaces_connection_status(**kwargs)
+            workspaces_status.extend(response.get('WorkspacesConnectionStatus', []))
+            if not response.get('NextToken'):
+                break
+            kwargs['NextToken'] = response['NextToken']
             
-            if workspaces_status:
-                processed_workspaces = []
-                current_time = datetime.now(timezone.utc)
-                
-                for ws in workspaces_status:
-                    workspace_id = ws.get('WorkspaceId', 'N/A')
-                    connection_state = ws.get('ConnectionState', 'UNKNOWN')
-                    last_connection = ws.get('LastKnownUserConnectionTimestamp')
-                    
-                    days_unused = 'Never connected'
-                    last_connection_str = 'Never'
-                    
-                    if last_connection:
-                        try:
-                            last_conn_dt = datetime.fromisoformat(last_connection.replace('Z', '+00:00'))
-                            days_unused = (current_time - last_conn_dt).days
-                            last_connection_str = last_conn_dt.strftime('%Y-%m-%d %H:%M')
-                        except:
-                            days_unused = 'Parse error'
-                    
-                    if days_unused == 'Never connected':
-                        usage_status = 'Never used'
-                        recommendation = 'Consider termination - never connected'
-                    elif isinstance(days_unused, int):
-                        if days_unused > 90:
-                            usage_status = 'Unused (90+ days)'
-                            recommendation = 'Consider termination - long unused'
-                        elif days_unused > 30:
-                            usage_status = 'Unused (30+ days)'
-                            recommendation = 'Review with user - may be unused'
-                        elif days_unused > 7:
-                            usage_status = 'Low usage (7+ days)'
-                            recommendation = 'Monitor usage patterns'
-                        else:
-                            usage_status = 'Active'
-                            recommendation = 'No action needed'
-                    else:
-                        usage_status = 'Unknown'
-                        recommendation = 'Manual review needed'
-                    
-                    processed_workspaces.append({
-                        'WorkspaceId': workspace_id,
-                        'ConnectionState': connection_state,
-                        'LastConnection': last_connection_str,
-                        'DaysUnused': days_unused,
-                        'UsageStatus': usage_status,
-                        'Recommendation': recommendation
-                    })
-                
-                df = pd.DataFrame(processed_workspaces)
-                df["Account"] = account_profile
-                usage_data.append(df)
-                print(f"Usage data for {account_profile}: {len(workspaces_status)} workspaces")
-        else:
-            print(f"Error retrieving usage for {account_profile}: {result.stderr}")
+        if workspaces_status:
+            df = summarise_usage(workspaces_status)
+            df["Account"] = account_profile
+            usage_data.append(df)
+            print(f"Usage data for {account_profile}: {len(workspaces_status)} workspaces")
     except Exception as e:
         print(f"Error getting usage for {account_profile}: {e}")
 
 
+def collect_workspaces_account(account_profile):
+    """Return (details frames, usage frames) for one account"""
+    print(f"\nProcessing profile: {account_profile}")
+    all_data = []
+    usage_data = []
+
+    # Details and connection status are independent calls, so run them together
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        executor.submit(get_workspaces_details, account_profile=account_profile, all_data=all_data)
+        executor.submit(get_workspaces_usage, account_profile=account_profile, usage_data=usage_data)
+    return all_data, usage_data
+
+
 def analyze_running_modes(workspaces_df):
     """Analyze running modes for pricing recommendations"""
     if workspaces_df.empty:
@@ -158,85 +155,83 @@ def analyze_running_modes(workspaces_df):
     running_mode_analysis.columns = ['Account', 'RunningMode', 'ComputeType', 'Count']
     
     # Add pricing recommendations
-    pricing_recommendations = []
-    for _, row in running_mode_analysis.iterrows():
-        if row['RunningMode'] == 'ALWAYS_ON':
-            pricing_model = 'Personal (Monthly fixed cost)'
-        elif row['RunningMode'] == 'AUTO_STOP':
-            pricing_model = 'Core/Pool (Pay per hour)'
-        else:
-            pricing_model = 'Unknown'
-        
-        pricing_recommendations.append(pricing_model)
-    
-    running_mode_analysis['PricingModel'] = pricing_recommendations
+    running_mode_analysis['PricingModel'] = running_mode_analysis['RunningMode'].map(PRICING_MODELS).fillna('Unknown')
     return running_mode_analysis
 
 
+def combined_by_account(workspaces_df, usage_df):
+    """Yield the outer join of workspace details and usage one account at a time"""
+    keys = ['Account', 'WorkspaceId']
+    details_rows = workspaces_df.groupby('Account', sort=False).indices
+    usage_rows = usage_df.groupby('Account', sort=False).indices
+    # Accounts in first-seen order; one with no usage data (or no details) still gets its rows
+    for account in dict.fromkeys([*details_rows, *usage_rows]):
+        details = workspaces_df.iloc[details_rows.get(account, [])].set_index(keys)
+        usage = usage_df.iloc[usage_rows.get(account, [])].set_index(keys)
+        # The two frames have no columns in common besides the keys
+        yield details.join(usage, how='outer').reset_index()
+
+
 if __name__ == "__main__":
     all_data = []
     usage_data = []
 
     # Load profiles from JSON file
-    try:
-        with open('aws_profiles.json', 'r') as f:
-            aws_profiles = json.load(f)
-    except FileNotFoundError:
-        print("aws_profiles.json not found. Using default profiles.")
-        aws_profiles = ["shared"]  # WorkSpaces typically in shared account
+    aws_profiles = load_profiles()
 
     print("Starting comprehensive WorkSpaces analysis...")
     
-    for profile in aws_profiles:
-        print(f"\nProcessing profile: {profile}")
-        get_workspaces_details(account_profile=profile, all_data=all_data)
-        get_workspaces_usage(account_profile=profile, usage_data=usage_data)
+    # Accounts are fetched concurrently on threads
+    for details, usage in map_profiles(collect_workspaces_account, aws_profiles):
+        all_data.extend(details)
+        usage_data.extend(usage)
 
     # Generate comprehensive report
     if all_data or usage_data:
         timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
         filename = f"workspaces_master_analysis_{timestamp}.xlsx"
 
-        with pd.ExcelWriter(filename) as writer:
-            # Main WorkSpaces details
-            if all_data:
-                workspaces_df = pd.concat(all_data, ignore_index=True)
-                columns = ["Account"] + [col for col in workspaces_df.columns if col != "Account"]
-                workspaces_df = workspaces_df[columns]
-                workspaces_df.to_excel(writer, index=False, sheet_name="WorkSpaces_Details")
-                
-                # Running mode analysis
-                running_mode_df = analyze_running_modes(workspaces_df)
-                if not running_mode_df.empty:
-                    running_mode_df.to_excel(writer, index=False, sheet_name="Running_Mode_Analysis")
-            
-            # Usage analysis
-            if usage_data:
-                usage_df = pd.concat(usage_data, ignore_index=True)
-                usage_df.to_excel(writer, index=False, sheet_name="Usage_Analysis")
-                
-                # Usage summary
-                usage_summary = usage_df.groupby(['Account', 'UsageStatus']).size().reset_index(name='Count')
-                usage_summary.to_excel(writer, index=False, sheet_name="Usage_Summary")
-                
-                # Unused workspaces
-                unused = usage_df[usage_df['UsageStatus'].str.contains('Unused|Never')]
-                if not unused.empty:
-                    unused.to_excel(writer, index=False, sheet_name="Unused_WorkSpaces")
-            
-            # Combined analysis (if both datasets available)
-            if all_data and usage_data:
-                workspaces_df = pd.concat(all_data, ignore_index=True)
-                usage_df = pd.concat(usage_data, ignore_index=True)
-                
-                combined = pd.merge(workspaces_df, usage_df, on=['Account', 'WorkspaceId'], how='outer')
-                combined.to_excel(writer, index=False, sheet_name="Combined_Analysis")
+        # Each dataset is concatenated once and reused for every sheet and the summary
+        workspaces_df = pd.concat(all_data, ignore_index=True) if all_data else None
+        usage_df = pd.concat(usage_data, ignore_index=True) if usage_data else None
+        if workspaces_df is not None:
+            columns = ["Account"] + [col for col in workspaces_df.columns if col != "Account"]
+            workspaces_df = workspaces_df[columns]
+        unused = usage_df[usage_df['UsageStatus'].isin(UNUSED_STATUSES)] if usage_df is not None else None
+
+        # Sheets are collected in report order and streamed to disk row by row
+        sheets = {}
+        # Main WorkSpaces details
+        if workspaces_df is not None:
+            sheets["WorkSpaces_Details"] = workspaces_df
+
+            # Running mode analysis
+            running_mode_df = analyze_running_modes(workspaces_df)
+            if not running_mode_df.empty:
+                sheets["Running_Mode_Analysis"] = running_mode_df
+
+        # Usage analysis
+        if usage_df is not None:
+            sheets["Usage_Analysis"] = usage_df
+
+            # Usage summary
+            sheets["Usage_Summary"] = usage_df.groupby(['Account', 'UsageStatus']).size().reset_index(name='Count')
+
+            # Unused workspaces
+            if not unused.empty:
+                sheets["Unused_WorkSpaces"] = unused
+
+        # Combined analysis (if both datasets available)
+        if workspaces_df is not None and usage_df is not None:
+            # Joined and written per account, so only one account's merge is held at a time
+            sheets["Combined_Analysis"] = combined_by_account(workspaces_df, usage_df)
+
+        write_xlsx(filename, sheets)
 
         print(f"\nWorkSpaces master analysis saved to: {filename}")
         
         # Print summary statistics
-        if all_data:
-            workspaces_df = pd.concat(all_data, ignore_index=True)
+        if workspaces_df is not None:
             print(f"Total WorkSpaces found: {len(workspaces_df)}")
             
             print("\nRunning Mode Distribution:")
@@ -244,14 +239,13 @@ if __name__ == "__main__":
             for mode, count in running_modes.items():
                 print(f"  {mode}: {count} workspaces")
         
-        if usage_data:
-            usage_df = pd.concat(usage_data, ignore_index=True)
+        if usage_df is not None:
             print("\nUsage Status Summary:")
             status_summary = usage_df['UsageStatus'].value_counts()
             for status, count in status_summary.items():
                 print(f"  {status}: {count} workspaces")
             
-            unused_count = len(usage_df[usage_df['UsageStatus'].str.contains('Unused|Never')])
+            unused_count = len(unused)
             if unused_count > 0:
                 print(f"\n*** {unused_count} WorkSpaces appear unused - potential cost savings! ***")
     else:
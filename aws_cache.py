@@ -0,0 +1,105 @@
+"""
+AWS Response Cache
+
+Small on-disk cache for AWS API responses, shared by the inventory scripts so that
+repeated runs (debugging, regenerating a report) can skip the network entirely.
+
+Features:
+- Responses stored gzip-compressed as JSON under <cache_dir>/<profile>/<method>_<hash>.json.gz
+- Cache key built from (profile, method, call parameters)
+- Entries expire after a TTL (default 1 hour)
+- Datetimes are stored as ISO 8601 strings, the same way the AWS CLI prints them
+- Uses orjson for (de)serialization when installed (pip install orjson), stdlib json otherwise
+
+Usage:
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, force=args.force)
+    images = cache.fetch(profile, 'ec2.describe_images', lambda: fetch_images(ec2), Owners=['self'])
+
+A cache created without a directory is disabled and simply calls through.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_TTL = 3600
+
+
+def json_iso_datetimes(value):
+    """json.dump default hook: serialize datetimes as ISO 8601 strings"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value):
+    """Serialize a response to JSON bytes"""
+    if orjson:
+        return orjson.dumps(value, default=json_iso_datetimes)
+    return json.dumps(value, default=json_iso_datetimes).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON bytes back into plain dicts and lists"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def add_cache_arguments(parser):
+    """Register the shared cache options on a script's argument parser"""
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Directory for cached AWS responses (caching is off when omitted)")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL,
+                        help=f"Seconds a cached response stays valid (default: {DEFAULT_TTL})")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignore cached responses and fetch everything again")
+
+
+class ResponseCache:
+    """Disk-backed memoization of AWS calls keyed by (profile, method, params)"""
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_TTL, force=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.force = force
+
+    def path(self, profile, method, params):
+        """Return the cache file path for a call"""
+        key = json.dumps(params, sort_keys=True, default=json_iso_datetimes)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, profile, f"{method}_{digest}.json.gz")
+
+    def fetch(self, profile, method, func, **params):
+        """Return the cached response for a call, or run func() and cache its result"""
+        if not self.cache_dir:
+            return func()
+
+        path = self.path(profile, method, params)
+        if not self.force and os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl:
+            try:
+                with gzip.open(path, 'rb') as f:
+                    return loads(f.read())
+            except (OSError, ValueError):
+                pass  # Unreadable entry, fetch again
+
+        data = dumps(func())
+
+        # Write to a temp file first so concurrent workers never read a partial entry
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        # Round-trip through JSON so cold and warm runs see identical data
+        return loads(data)
@@ -0,0 +1,110 @@
+"""
+Shared boto3 session and client helpers for the inventory scripts.
+
+Each AWS profile gets one boto3 Session per process, and every client created from it
+uses the same retry configuration. Clients skip SSL verification to match the
+--no-verify-ssl behaviour the scripts previously used with the AWS CLI.
+
+Entries in aws_profiles.json may be either profile names or 12-digit account IDs.
+Account IDs are reached from a single master session (default credential chain) by
+assuming ORG_ROLE_NAME in each account, so large Organizations don't need a
+config-file profile per account. Set AWS_ORG_ROLE_NAME to use a different role.
+The assumed-role credentials refresh themselves before they expire, so long runs
+outlive the one-hour STS session.
+
+Accounts are fetched concurrently on threads with map_profiles; boto3 clients are
+thread-safe and the work is network-bound, so no worker processes are needed.
+
+Usage:
+    from aws_session import get_client, map_profiles
+    acm = get_client(profile, 'acm')
+    results = map_profiles(fetch_account, profiles)
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import DeferredRefreshableCredentials
+
+# Adaptive retries back off automatically when AWS throttles a burst of calls.
+# The connection pool is sized above the per-account thread pools (botocore defaults to 10),
+# so concurrent calls reuse kept-alive TLS connections instead of opening new ones.
+CLIENT_CONFIG = Config(retries={'max_attempts': 10, 'mode': 'adaptive'}, max_pool_connections=64)
+# Role assumed in member accounts listed by account ID
+ORG_ROLE_NAME = os.environ.get('AWS_ORG_ROLE_NAME', 'OrgReadOnly')
+# Accounts fetched at once by map_profiles
+MAX_PROFILE_WORKERS = 32
+
+# Sessions are not thread-safe, so client creation is serialized
+_client_lock = threading.Lock()
+# Separate lock for the master STS client: credential refreshes can start while _client_lock is held
+_sts_lock = threading.Lock()
+
+
+def is_account_id(profile):
+    """Return True if a profiles entry is an AWS account ID rather than a profile name"""
+    return len(profile) == 12 and profile.isdigit()
+
+
+@lru_cache(maxsize=None)
+def get_master_session():
+    """Return the session used to assume roles into member accounts"""
+    return boto3.Session()
+
+
+@lru_cache(maxsize=None)
+def get_master_sts():
+    """Return the STS client used for every assume_role call"""
+    with _sts_lock:
+        return get_master_session().client('sts', config=CLIENT_CONFIG, verify=False)
+
+
+def assume_org_role(account_id):
+    """Assume ORG_ROLE_NAME in an account, in the form RefreshableCredentials expects"""
+    creds = get_master_sts().assume_role(
+        RoleArn=f"arn:aws:iam::{account_id}:role/{ORG_ROLE_NAME}",
+        RoleSessionName='aws-inventory'
+    )['Credentials']
+    return {
+        'access_key': creds['AccessKeyId'],
+        'secret_key': creds['SecretAccessKey'],
+        'token': creds['SessionToken'],
+        'expiry_time': creds['Expiration'].isoformat()
+    }
+
+
+@lru_cache(maxsize=None)
+def get_session(profile):
+    """Return the cached boto3 Session for a profile name or account ID"""
+    if not is_account_id(profile):
+        return boto3.Session(profile_name=profile)
+
+    # The role is assumed on first use and again shortly before each expiry,
+    # instead of caching one set of static credentials for the whole process
+    credentials = DeferredRefreshableCredentials(
+        refresh_using=lambda: assume_org_role(profile),
+        method='sts-assume-role'
+    )
+    session = botocore.session.get_session()
+    # botocore has no public setter for a session's credential object
+    session._credentials = credentials
+    return boto3.Session(botocore_session=session, region_name=get_master_session().region_name)
+
+
+@lru_cache(maxsize=None)
+def get_client(profile, service, region_name=None):
+    """Return the cached client for a service using the profile's shared session"""
+    with _client_lock:
+        return get_session(profile).client(service, region_name=region_name,
+                                           config=CLIENT_CONFIG, verify=False)
+
+
+def map_profiles(worker, profiles, max_workers=MAX_PROFILE_WORKERS):
+    """Run worker(profile) for every profile on a thread pool and return results in order"""
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(profiles)))) as executor:
+        return list(executor.map(worker, profiles))
@@ -0,0 +1,38 @@
+"""
+Shared loader for aws_profiles.json.
+
+The file is read and validated once per process; every script that imports
+load_profiles gets the same tuple back.
+
+Accepted formats:
+    ["int", "shared", "dnaProd"]
+    {"profiles": ["int", "shared", "dnaProd"]}
+"""
+
+import json
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PROFILES_FILE = 'aws_profiles.json'
+DEFAULT_PROFILES = ("shared",)
+
+
+@lru_cache(maxsize=None)
+def load_profiles(path=PROFILES_FILE, default=DEFAULT_PROFILES):
+    """Return the profile names from path, or default when the file does not exist"""
+    try:
+        with open(path, 'rb') as f:
+            data = orjson.loads(f.read()) if orjson else json.load(f)
+    except FileNotFoundError:
+        print(f"{path} not found, using default profiles")
+        return tuple(default)
+
+    if isinstance(data, dict):
+        data = data.get('profiles', [])
+    if not isinstance(data, list) or not all(isinstance(profile, str) for profile in data):
+        raise ValueError(f"{path} must be a JSON list of profile names")
+    return tuple(data)
@@ -0,0 +1,79 @@
+"""
+Report writing helpers shared by the inventory scripts.
+
+Workbooks are written row by row with xlsxwriter in constant_memory mode, so each row
+is flushed to disk as soon as the next one starts. Frames are converted for the writer
+in CHUNK_ROWS slices, so only one slice's converted copy is held at a time. pandas' to_excel can't be used for this: it writes cells column by
+column, and constant_memory mode silently drops cells written above the current row.
+URL detection is turned off: inventories are full of ARNs and endpoints, and
+xlsxwriter would otherwise run a URL regex over every string cell and turn matches
+into hyperlinks.
+
+Parquet output (pip install pyarrow) is offered as a much faster alternative for
+pipelines that don't need a spreadsheet.
+
+Usage:
+    from report_utils import write_parquet, write_xlsx
+    write_xlsx(filename, {"Inventory": df, "Summary": summary_df})
+    write_xlsx(filename, {"Combined": (group for _, group in df.groupby("Account"))})
+    write_parquet(filename, df)
+"""
+
+import pandas as pd
+import xlsxwriter
+
+XLSX_OPTIONS = {
+    'constant_memory': True,
+    'strings_to_urls': False,
+    # Excel has no time zones; aware timestamps are written as their wall-clock time
+    'remove_timezone': True,
+    'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+}
+
+
+# Rows converted for the writer at a time on large sheets
+CHUNK_ROWS = 50_000
+# Values xlsxwriter can't write natively; to_excel wrote them as their text
+CONTAINER_TYPES = (list, tuple, dict, set)
+
+
+def write_rows(worksheet, df, first_row=1, chunk_rows=CHUNK_ROWS):
+    """Write a frame's rows from first_row on, one chunk_rows slice at a time; returns the next free row"""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        # One vectorized pass per slice turns NaN/NaT/NA into None and numpy scalars into
+        # Python ones, so only one slice's object copy exists at a time
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row_number, row in enumerate(chunk.itertuples(index=False, name=None), start=first_row + start):
+            worksheet.write_row(row_number, 0, [str(value) if isinstance(value, CONTAINER_TYPES) else value
+                                                for value in row])
+    return first_row + len(df)
+
+
+def write_xlsx(path, sheets, chunk_rows=CHUNK_ROWS):
+    """Write {sheet_name: DataFrame} to a workbook row by row, sheets in dict order.
+
+    A sheet may also be given as an iterable of frames with the same columns (e.g. a
+    generator yielding one account at a time); they are written one after another under
+    the first frame's header, so only one of them needs to exist at a time.
+    """
+    workbook = xlsxwriter.Workbook(path, XLSX_OPTIONS)
+    try:
+        header_format = workbook.add_format({'bold': True})
+        for sheet_name, frames in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name)
+            next_row = None
+            for df in [frames] if isinstance(frames, pd.DataFrame) else frames:
+                if next_row is None:
+                    worksheet.write_row(0, 0, [str(column) for column in df.columns], header_format)
+                    next_row = 1
+                next_row = write_rows(worksheet, df, next_row, chunk_rows)
+    finally:
+        workbook.close()
+
+
+def write_parquet(path, df):
+    """Write a frame to a zstd-compressed Parquet file"""
+    # Parquet needs one type per column; inventory fields mix None, booleans, dicts and strings
+    object_columns = df.select_dtypes(include='object').columns
+    df.astype({col: 'string' for col in object_columns}).to_parquet(path, index=False, compression='zstd')
@@ -17,6 +17,11 @@ Options:
     --check-keyword TEXT    Substring to search in recommendation name
     --resource-match TEXT   Substring to match in resourceId or ARN
     --region REGION         AWS region (default: ap-southeast-2)
+    --no-cache              Always call list-recommendations instead of reusing a cached copy
+    --batch                 Never prompt; exit with an error if a value is missing or ambiguous
+
+--profile, --check-keyword and --resource-match default to the AWS_PROFILE, TA_CHECK_KEYWORD
+and TA_RESOURCE_MATCH environment variables.
 
 Examples:
     # Run with all parameters
@@ -24,21 +29,44 @@ Examples:
     
     # Run interactively
     python ta_exclusion_builder.py
+    
+    # Run unattended, e.g. under xargs -P or GNU parallel
+    TA_CHECK_KEYWORD="RDS storage encryption" python ta_exclusion_builder.py --profile int --resource-match "" --batch
 
 The script will prompt for any missing parameters and allow you to choose whether to exclude all resources
 or specific ones matching your criteria.
+
+The list-recommendations response is cached per profile and region under ~/.cache/ta_exclusion_builder
+for an hour, so repeated runs against the same account skip the slowest call.
 """
 
 import argparse
 import json
+import os
 import subprocess
 import sys
 import re
-import shutil
-from typing import List, Dict, Any, Optional, Tuple
+import tempfile
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from aws_cache import ResponseCache
 
 # Default region
 DEFAULT_REGION = "ap-southeast-2"
+# Where list-recommendations responses are kept between runs
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ta_exclusion_builder")
+
+# Try to import orjson for faster JSON parsing (pip install orjson)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Try to import ijson to stream large CLI responses (pip install ijson)
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # Try to import colorama for colored output
 try:
@@ -77,51 +105,62 @@ def warning(msg: str) -> None:
     print(colorize(msg, Fore.YELLOW if HAS_COLOR else ""))
 
 
-def check_jq_availability() -> bool:
-    """Check if jq is available in the system."""
-    # We don't actually need jq since we're using Python's json module
-    return True
+def aws_cli_command(cmd: List[str], profile: str, region: str) -> List[str]:
+    """Return the full AWS CLI argument list for a command."""
+    # Add no-verify-ssl to disable SSL verification
+    return ["aws"] + cmd + ["--profile", profile, "--region", region, "--no-verify-ssl"]
 
 
 def run_aws_command(cmd: List[str], profile: str, region: str) -> Tuple[bool, Any]:
     """Run AWS CLI command and return parsed JSON output."""
-    # Add no-verify-ssl to disable SSL verification
-    full_cmd = ["aws"] + cmd + ["--profile", profile, "--region", region, "--no-verify-ssl"]
+    full_cmd = aws_cli_command(cmd, profile, region)
     
     try:
-        result = subprocess.run(full_cmd, capture_output=True, text=True, check=False)
+        # Keep stdout as bytes; both parsers decode UTF-8 themselves
+        result = subprocess.run(full_cmd, capture_output=True, check=False)
         
         if result.returncode != 0:
-            error_msg = result.stderr.strip() or "Unknown error"
+            error_msg = result.stderr.decode(errors="replace").strip() or "Unknown error"
             return False, error_msg
         
         try:
-            return True, json.loads(result.stdout)
-        except json.JSONDecodeError:
+            return True, orjson.loads(result.stdout) if orjson else json.loads(result.stdout)
+        except json.JSONDecodeError:  # orjson.JSONDecodeError is a subclass
             return False, "Failed to parse JSON output from AWS CLI"
     
     except subprocess.SubprocessError as e:
         return False, f"Failed to execute AWS CLI command: {str(e)}"
 
 
-def list_recommendations(profile: str, region: str, check_keyword: str) -> List[Dict[str, Any]]:
-    """List Trusted Advisor recommendations matching the keyword."""
-    success, result = run_aws_command(["trustedadvisor", "list-recommendations"], profile, region)
+def fetch_recommendations(profile: str, region: str, cache: ResponseCache) -> Dict[str, Any]:
+    """Return the list-recommendations response, from the cache when it is fresh."""
+    def fetch() -> Dict[str, Any]:
+        success, result = run_aws_command(["trustedadvisor", "list-recommendations"], profile, region)
+        if not success:
+            # Exits, so failures are never cached
+            error(f"Failed to list recommendations: {result}")
+        return result
     
-    if not success:
-        error(f"Failed to list recommendations: {result}")
+    return cache.fetch(profile, "trustedadvisor.list_recommendations", fetch, region=region)
+
+
+def list_recommendations(profile: str, region: str, check_keyword: str,
+                         cache: Optional[ResponseCache] = None) -> List[Dict[str, Any]]:
+    """List Trusted Advisor recommendations matching the keyword."""
+    result = fetch_recommendations(profile, region, cache or ResponseCache())
     
     matching_recommendations = []
+    keyword = check_keyword.casefold()
     
     # The actual key is 'recommendationSummaries' not 'recommendations'
     for rec in result.get("recommendationSummaries", []):
-        if check_keyword.lower() in rec.get("name", "").lower():
+        if keyword in rec.get("name", "").casefold():
             matching_recommendations.append(rec)
     
     return matching_recommendations
 
 
-def select_recommendation(recommendations: List[Dict[str, Any]]) -> Dict[str, Any]:
+def select_recommendation(recommendations: List[Dict[str, Any]], interactive: bool = True) -> Dict[str, Any]:
     """Let user select a recommendation from the list."""
     if not recommendations:
         error("No recommendations found matching the keyword.")
@@ -135,6 +174,9 @@ def select_recommendation(recommendations: List[Dict[str, Any]]) -> Dict[str, An
     for i, rec in enumerate(recommendations, 1):
         print(f"{i}. {rec['name']} (ID: {rec['id']})")
     
+    if not interactive:
+        error("--batch needs a --check-keyword that matches exactly one recommendation.")
+    
     while True:
         try:
             choice = int(input("\nSelect a recommendation (number): "))
@@ -145,51 +187,66 @@ def select_recommendation(recommendations: List[Dict[str, Any]]) -> Dict[str, An
             warning("Please enter a number.")
 
 
+def iter_aws_command_items(cmd: List[str], profile: str, region: str, prefix: str) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a list in the AWS CLI JSON output as they are parsed.
+
+    With ijson installed, the output is streamed so only one item is held at a time;
+    otherwise it is parsed in one go. prefix is the ijson path, e.g. "resources.item".
+    """
+    if ijson is None:
+        success, result = run_aws_command(cmd, profile, region)
+        if not success:
+            error(f"AWS CLI command failed: {result}")
+        yield from result.get(prefix.split(".")[0], [])
+        return
+    
+    # stderr goes to a file so a chatty CLI can't fill the pipe while stdout is being read
+    with tempfile.TemporaryFile() as stderr_file:
+        with subprocess.Popen(aws_cli_command(cmd, profile, region),
+                              stdout=subprocess.PIPE, stderr=stderr_file) as proc:
+            try:
+                yield from ijson.items(proc.stdout, prefix)
+                parse_error = None
+            except ijson.JSONError as e:
+                parse_error = e
+            proc.stdout.read()
+            returncode = proc.wait()
+        
+        if returncode != 0:
+            stderr_file.seek(0)
+            error(f"AWS CLI command failed: {stderr_file.read().decode(errors='replace').strip() or 'Unknown error'}")
+        if parse_error:
+            error(f"Failed to parse JSON output from AWS CLI: {parse_error}")
+
+
 def list_recommendation_resources(profile: str, region: str, recommendation: Dict[str, Any], resource_match: str) -> List[Dict[str, Any]]:
     """List resources for a recommendation that match the resource filter."""
     # The ARN is already provided in the recommendation
     rec_arn = recommendation["arn"]
     
-    success, result = run_aws_command(
+    resources = iter_aws_command_items(
         ["trustedadvisor", "list-recommendation-resources", 
          "--recommendation-identifier", rec_arn],
-        profile, region
+        profile, region,
+        # The actual key is 'recommendationResourceSummaries' not 'resources'
+        "recommendationResourceSummaries.item"
     )
     
-    if not success:
-        error(f"Failed to list recommendation resources: {result}")
-    
     matching_resources = []
+    # Case-insensitive substring search, compiled once rather than lowercasing per resource
+    pattern = re.compile(re.escape(resource_match), re.IGNORECASE)
     
-    # The actual key is 'recommendationResourceSummaries' not 'resources'
-    for resource in result.get("recommendationResourceSummaries", []):
-        resource_id = resource.get("awsResourceId", "")
-        resource_arn = resource.get("arn", "")
-        
+    # Resources are filtered as they arrive, so non-matching ones are never kept
+    for resource in resources:
         # If resource_match is empty, include all resources
         # Otherwise, check if resource_match is in either resourceId or ARN
-        if not resource_match or (resource_match.lower() in resource_id.lower() or 
-                                resource_match.lower() in resource_arn.lower()):
+        if (not resource_match or pattern.search(resource.get("awsResourceId", ""))
+                or pattern.search(resource.get("arn", ""))):
             matching_resources.append(resource)
     
     return matching_resources
 
 
-# This function is no longer used as the functionality is now in build_cli_commands
-# Keeping it commented out for reference
-# def build_exclusion_json(resources: List[Dict[str, Any]]) -> str:
-#     """Build JSON for resource exclusions."""
-#     exclusions = []
-#     
-#     for resource in resources:
-#         exclusions.append({
-#             "arn": resource["arn"],
-#             "isExcluded": True
-#         })
-#     
-#     return json.dumps(exclusions)
-
-
 def build_cli_commands(profile: str, region: str, resources: List[Dict[str, Any]]) -> List[str]:
     """Build AWS CLI commands for batch exclusion update, splitting into multiple commands if needed."""
     # Maximum number of resources per command to avoid length constraints
@@ -201,14 +258,8 @@ def build_cli_commands(profile: str, region: str, resources: List[Dict[str, Any]
         chunk = resources[i:i + MAX_RESOURCES_PER_COMMAND]
         
         # Build exclusion JSON for this chunk
-        exclusions = []
-        for resource in chunk:
-            exclusions.append({
-                "arn": resource["arn"],
-                "isExcluded": True
-            })
-        
-        exclusions_json = json.dumps(exclusions)
+        exclusions = [{"arn": resource["arn"], "isExcluded": True} for resource in chunk]
+        exclusions_json = orjson.dumps(exclusions).decode() if orjson else json.dumps(exclusions)
         
         # Build command for this chunk
         command = (f"aws trustedadvisor batch-update-recommendation-resource-exclusion "
@@ -226,32 +277,43 @@ def main() -> None:
         description="Build AWS CLI commands for Trusted Advisor recommendation exclusions"
     )
     
-    parser.add_argument("--profile", type=str, help="AWS CLI profile name")
-    parser.add_argument("--check-keyword", type=str, help="Substring to search in recommendation name")
-    parser.add_argument("--resource-match", type=str, help="Substring to match in resourceId or ARN")
+    # Unset options fall back to environment variables before prompting
+    parser.add_argument("--profile", type=str, default=os.environ.get("AWS_PROFILE"),
+                        help="AWS CLI profile name (default: $AWS_PROFILE)")
+    parser.add_argument("--check-keyword", type=str, default=os.environ.get("TA_CHECK_KEYWORD"),
+                        help="Substring to search in recommendation name (default: $TA_CHECK_KEYWORD)")
+    parser.add_argument("--resource-match", type=str, default=os.environ.get("TA_RESOURCE_MATCH"),
+                        help="Substring to match in resourceId or ARN; empty matches all (default: $TA_RESOURCE_MATCH)")
     parser.add_argument("--region", type=str, default=DEFAULT_REGION, 
                         help=f"AWS region (default: {DEFAULT_REGION})")
     parser.add_argument("--no-verify-ssl", action="store_true", default=True,
                         help="Disable SSL certificate verification (default: enabled)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Don't reuse list-recommendations responses cached in {DEFAULT_CACHE_DIR}")
+    parser.add_argument("--batch", action="store_true",
+                        help="Never prompt; fail if a value is missing or the keyword is ambiguous")
     
     args = parser.parse_args()
     
-    # We don't need jq anymore
-    pass
-    
     # Get profile if not provided
     profile = args.profile
     if not profile:
+        if args.batch:
+            error("--profile (or AWS_PROFILE) is required with --batch")
         profile = input("Enter AWS CLI profile name: ")
     
     # Get check keyword if not provided
     check_keyword = args.check_keyword
     if not check_keyword:
+        if args.batch:
+            error("--check-keyword (or TA_CHECK_KEYWORD) is required with --batch")
         check_keyword = input("Enter substring to search in recommendation name: ")
     
     # Get resource match if not provided
     resource_match = args.resource_match
-    if not resource_match:
+    if resource_match is None:
+        if args.batch:
+            error("--resource-match (or TA_RESOURCE_MATCH) is required with --batch; pass \"\" to match all")
         all_resources = input("Do you want to exclude all resources? (y/n): ").lower().strip() == 'y'
         if all_resources:
             resource_match = ""  # Empty string will match all resources
@@ -260,11 +322,12 @@ def main() -> None:
     
     # Get region
     region = args.region
+    cache = ResponseCache(None if args.no_cache else DEFAULT_CACHE_DIR)
     
     # List and select recommendation
     info(f"Searching for recommendations containing '{check_keyword}'...")
-    recommendations = list_recommendations(profile, region, check_keyword)
-    recommendation = select_recommendation(recommendations)
+    recommendations = list_recommendations(profile, region, check_keyword, cache)
+    recommendation = select_recommendation(recommendations, interactive=not args.batch)
     
     # List matching resources
     if resource_match:
@@ -316,5 +379,5 @@ def main() -> None:
 if __name__ == "__main__":
     main()
 
-# No external requirements needed beyond standard library
-# Optional: colorama for colored output
\ No newline at end of file
+# No external requirements needed beyond standard library (aws_cache.py from this repo is stdlib-only)
+# Optional: colorama for colored output, ijson to stream large resource lists, orjson for faster parsing
\ No newline at end of file